@@ -2,11 +2,10 @@
 
 import os
 import random
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from django.conf import settings
 from django.core.handlers.wsgi import WSGIRequest
-from django.db import transaction
 from django.http import HttpResponseBadRequest
 from django.http import HttpResponseRedirect
 from django.http.response import HttpResponse, JsonResponse
@@ -21,6 +20,7 @@ from core.network_info import NetworkInfo
 from core.settings.settings import Settings
 from core.state_handler import Stateful
 from core.user_manager import UserManager
+from core.visitors import Visitors
 
 
 class Base(Stateful):
@@ -30,6 +30,7 @@ class Base(Stateful):
         self.urlpatterns: List[URLPattern] = []
         self.settings = Settings(self)
         self.user_manager = UserManager(self)
+        self.visitors = Visitors(self)
         self.lights = Lights(self)
         self.musiq = Musiq(self)
         self.network_info = NetworkInfo(self)
@@ -55,20 +56,10 @@ class Base(Stateful):
             return os.path.join(settings.STATIC_URL, "apk/shareberry.apk")
         return "https://github.com/raveberry/shareberry/releases/latest/download/shareberry.apk"
 
-    def _increment_counter(self) -> int:
-        with transaction.atomic():
-            counter = models.Counter.objects.get_or_create(id=1, defaults={"value": 0})[
-                0
-            ]
-            counter.value += 1
-            counter.save()
-        self.update_state()
-        return counter.value
-
     def context(self, request: WSGIRequest) -> Dict[str, Any]:
         """Returns the base context that is needed on every page.
         Increments the visitors counter."""
-        self._increment_counter()
+        self.visitors.increment()
         return {
             "base_urls": self.urlpatterns,
             "voting_system": self.settings.basic.voting_system,
@@ -86,15 +77,21 @@ class Base(Stateful):
             or self.settings.sound.output == "icecast",
         }
 
+    def base_stateful(self) -> Optional[Stateful]:
+        # this is the base
+        return None
+
+    def page_state_dict(self) -> Dict[str, Any]:
+        # the base state is sent on its own, to clients of every page
+        return self.state_dict()
+
     def state_dict(self) -> Dict[str, Any]:
         # this function constructs a base state dictionary with website wide state
         # pages sending states extend this state dictionary
         return {
             "partymode": self.user_manager.partymode_enabled(),
             "users": self.user_manager.get_count(),
-            "visitors": models.Counter.objects.get_or_create(
-                id=1, defaults={"value": 0}
-            )[0].value,
+            "visitors": self.visitors.get_count(),
             "lightsEnabled": self.lights.loop_active.is_set(),
             "alarm": self.musiq.playback.alarm_playing.is_set(),
             "defaultPlatform": "spotify"
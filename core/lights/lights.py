@@ -243,9 +243,10 @@ class Lights(Stateful):
                 ).value
                 device.last_program = self.led_programs[last_program_name]
 
-    def state_dict(self) -> Dict[str, Any]:
-        state_dict = self.base.state_dict()
+    def base_stateful(self) -> Stateful:
+        return self.base
 
+    def page_state_dict(self) -> Dict[str, Any]:
         lights_state = {}
         lights_state["ringConnected"] = self.ring.initialized
         lights_state["ringProgram"] = self.ring.program.name
@@ -268,8 +269,7 @@ class Lights(Stateful):
             *(int(val * 255) for val in self.fixed_color)
         )
 
-        state_dict["lights"] = lights_state
-        return state_dict
+        return {"lights": lights_state}
 
     def index(self, request: WSGIRequest) -> HttpResponse:
         """Renders the /lights page. During voting, only privileged users can access this."""
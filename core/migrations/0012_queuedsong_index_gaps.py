@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+def spread_indices(apps, schema_editor):
+    """Moves the consecutive indices of queued songs apart,
+    so songs can be reordered without renumbering the whole queue."""
+    QueuedSong = apps.get_model("core", "QueuedSong")
+    songs = list(QueuedSong.objects.order_by("index"))
+    for position, song in enumerate(songs, start=1):
+        song.index = position * 1024
+    QueuedSong.objects.bulk_update(songs, ["index"])
+
+
+def compact_indices(apps, schema_editor):
+    QueuedSong = apps.get_model("core", "QueuedSong")
+    songs = list(QueuedSong.objects.order_by("index"))
+    for position, song in enumerate(songs, start=1):
+        song.index = position
+    QueuedSong.objects.bulk_update(songs, ["index"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("core", "0011_auto_20210427_1339")]
+
+    operations = [
+        migrations.AlterField(
+            model_name="queuedsong",
+            name="index",
+            field=models.IntegerField(db_index=True),
+        ),
+        migrations.RunPython(spread_indices, compact_indices),
+    ]
@@ -103,7 +103,8 @@ class QueuedSong(models.Model):
     """Stores a song in the song queue so the queue is not lost on server restart."""
 
     id: int
-    index = models.IntegerField()
+    # sparse ordering key, see core.musiq.song_queue
+    index = models.IntegerField(db_index=True)
     manually_requested = models.BooleanField()
     votes = models.IntegerField(default=0)
     internal_url = models.CharField(max_length=2000)
@@ -8,14 +8,13 @@ from functools import wraps
 from typing import Callable, TYPE_CHECKING
 
 from django.core.handlers.wsgi import WSGIRequest
-from django.db import transaction
-from django.db.models import F
 from django.http import HttpResponseForbidden
 from django.http.response import HttpResponse, HttpResponseBadRequest
 from django.views.decorators.csrf import csrf_exempt
 
 import core.models as models
 from core.models import Setting
+from core.musiq.votes import Votes
 
 if TYPE_CHECKING:
     from core.musiq.musiq import Musiq
@@ -69,12 +68,13 @@ class Controller:
         self.shuffle: bool = (
             self.musiq.base.settings.get_setting("shuffle", "False") == "True"
         )
-        self.repeat: bool = self.musiq.base.settings.get_setting(
-            "repeat", "False"
-        ) == "True"
+        self.repeat: bool = (
+            self.musiq.base.settings.get_setting("repeat", "False") == "True"
+        )
         self.autoplay: bool = (
             self.musiq.base.settings.get_setting("autoplay", "False") == "True"
         )
+        self.votes = Votes(self.musiq)
 
     def start(self) -> None:
         try:
@@ -96,68 +96,66 @@ class Controller:
                     active_sink = True
             self.volume = volume / 100
         except (FileNotFoundError, subprocess.CalledProcessError, ValueError):
-            with self.playback.mopidy_command(important=True):
+            with self.playback.backend.command(important=True, read_only=True):
                 # pulse is not installed or there is no server running.
-                # get volume from mopidy
-                self.volume = self.playback.player.mixer.get_volume() / 100
+                # get volume from the player
+                self.volume = self.playback.backend.get_volume()
 
     @disabled_when_voting
     @control
     def restart(self, _request: WSGIRequest) -> None:
         """Restarts the current song from the beginning."""
-        with self.playback.mopidy_command() as allowed:
+        with self.playback.backend.command() as allowed:
             if allowed:
-                self.playback.player.playback.seek(0)
+                self.playback.backend.seek(0)
 
     @disabled_when_voting
     @control
     def seek_backward(self, _request: WSGIRequest) -> None:
         """Jumps back in the current song."""
-        with self.playback.mopidy_command() as allowed:
+        with self.playback.backend.command() as allowed:
             if allowed:
-                current_position = self.playback.player.playback.get_time_position()
-                self.playback.player.playback.seek(
-                    current_position - self.SEEK_DISTANCE
-                )
+                # the position is known without querying the player
+                current_position = self.playback.status.current_position()
+                self.playback.backend.seek(current_position - self.SEEK_DISTANCE)
 
     @disabled_when_voting
     @control
     def play(self, _request: WSGIRequest) -> None:
         """Resumes the current song if it is paused.
         No-op if already playing."""
-        with self.playback.mopidy_command() as allowed:
+        with self.playback.backend.command() as allowed:
             if allowed:
-                self.playback.player.playback.play()
+                self.playback.backend.play()
 
     @disabled_when_voting
     @control
     def pause(self, _request: WSGIRequest) -> None:
         """Pauses the current song if it is playing.
         No-op if already paused."""
-        with self.playback.mopidy_command() as allowed:
+        with self.playback.backend.command() as allowed:
             if allowed:
-                self.playback.player.playback.pause()
+                self.playback.backend.pause()
 
     @disabled_when_voting
     @control
     def seek_forward(self, _request: WSGIRequest) -> None:
         """Jumps forward in the current song."""
-        with self.playback.mopidy_command() as allowed:
+        with self.playback.backend.command() as allowed:
             if allowed:
-                current_position = self.playback.player.playback.get_time_position()
-                self.playback.player.playback.seek(
-                    current_position + self.SEEK_DISTANCE
-                )
+                # the position is known without querying the player
+                current_position = self.playback.status.current_position()
+                self.playback.backend.seek(current_position + self.SEEK_DISTANCE)
 
     @disabled_when_voting
     @control
     def skip(self, _request: WSGIRequest) -> None:
         """Skips the current song and continues with the next one."""
-        with self.playback.mopidy_command() as allowed:
+        with self.playback.backend.command() as allowed:
             if allowed:
                 if self.playback.backup_playing.is_set():
                     self.playback.backup_playing.clear()
-                self.playback.player.playback.next()
+                self.playback.backend.next()
 
     @disabled_when_voting
     @control
@@ -205,10 +203,11 @@ class Controller:
             )
         except (FileNotFoundError, subprocess.CalledProcessError):
             # pulse is not installed or there is no server running.
-            # change mopidy's volume
-            with self.playback.mopidy_command() as allowed:
-                if allowed:
-                    self.playback.player.mixer.set_volume(round(self.volume * 100))
+            # change the volume of every player, so it persists when the backend changes
+            for backend in self.playback.backends:
+                with backend.command() as allowed:
+                    if allowed:
+                        backend.set_volume(self.volume)
 
     @disabled_when_voting
     @control
@@ -225,11 +224,9 @@ class Controller:
         """Empties the queue. Only admin is permitted to do this."""
         if not self.musiq.base.user_manager.is_admin(request.user):
             return HttpResponseForbidden()
-        with self.playback.mopidy_command() as allowed:
+        with self.playback.backend.command() as allowed:
             if allowed:
-                with transaction.atomic():
-                    count = self.playback.queue.count()
-                    self.playback.queue.all().delete()
+                count = self.playback.queue.remove_all()
                 for _ in range(count):
                     self.playback.queue_semaphore.acquire(blocking=False)
         return HttpResponse()
@@ -291,52 +288,24 @@ class Controller:
             return HttpResponseBadRequest("request on old state")
         return HttpResponse()
 
-    @control
     @csrf_exempt
     def vote_up(self, request: WSGIRequest) -> HttpResponse:
-        """Increases the vote-count of the given song by one."""
-        key = request.POST.get("key")
-        if key is None:
-            return HttpResponseBadRequest()
-        ikey = int(key)
-
-        models.CurrentSong.objects.filter(queue_key=ikey).update(votes=F("votes") + 1)
-        self.playback.queue.vote_up(ikey)
-        return HttpResponse()
+        """Increases the vote-count of the given song by one.
+        Votes are applied in batches, the state is updated when the batch is applied."""
+        return self._vote(request, 1)
 
-    @control
     @csrf_exempt
     def vote_down(self, request: WSGIRequest) -> HttpResponse:
         """Decreases the vote-count of the given song by one.
         If a song receives too many downvotes, it is removed."""
+        return self._vote(request, -1)
+
+    def _vote(self, request: WSGIRequest, amount: int) -> HttpResponse:
+        # don't allow votes during alarm
+        if self.playback.alarm_playing.is_set():
+            return HttpResponseBadRequest()
         key = request.POST.get("key")
         if key is None:
             return HttpResponseBadRequest()
-        ikey = int(key)
-
-        models.CurrentSong.objects.filter(queue_key=ikey).update(votes=F("votes") - 1)
-        try:
-            current_song = models.CurrentSong.objects.get()
-            if (
-                current_song.queue_key == ikey
-                and current_song.votes
-                <= -self.musiq.base.settings.basic.downvotes_to_kick
-            ):
-                with self.playback.mopidy_command() as allowed:
-                    if allowed:
-                        self.playback.player.playback.next()
-        except models.CurrentSong.DoesNotExist:
-            pass
-
-        removed = self.playback.queue.vote_down(
-            ikey, -self.musiq.base.settings.basic.downvotes_to_kick
-        )
-        # if we removed a song by voting, and it was added by autoplay,
-        # we want it to be the new basis for autoplay
-        if removed is not None:
-            self.playback.queue_semaphore.acquire(blocking=False)
-            if not removed.manually_requested:
-                self.playback.handle_autoplay(removed.external_url or removed.title)
-            else:
-                self.playback.handle_autoplay()
+        self.votes.vote(int(key), amount)
         return HttpResponse()
@@ -0,0 +1,291 @@
+"""This module contains the backend that plays local files in-process with GStreamer.
+Importing it raises a ModuleNotFoundError or a ValueError if GStreamer is not installed."""
+
+from __future__ import annotations
+
+import logging
+from threading import Lock, RLock
+from typing import List, Optional, Tuple
+
+import cachetools
+import gi
+from django.conf import settings
+
+from core.musiq.player_backend import PlayerBackend
+from core.util import background_thread
+
+gi.require_version("Gst", "1.0")
+from gi.repository import Gst  # pylint: disable=wrong-import-position
+
+Gst.init(None)
+
+
+class GStreamerBackend(PlayerBackend):
+    """Plays file:// uris with a playbin inside the raveberry process.
+    Compared to mopidy, there is no separate process and no HTTP request per command.
+    The status is updated from GStreamer's bus messages, e.g. end-of-stream,
+    and the position is reported regularly while playing.
+    Gapless playback uses playbin's about-to-finish signal
+    to continue with the next track in the tracklist."""
+
+    # seconds between updates of the position while playing
+    POSITION_INTERVAL = 1
+
+    def __init__(self) -> None:
+        super().__init__("gstreamer")
+        self.playbin = Gst.ElementFactory.make("playbin", "raveberry")
+        sink = Gst.ElementFactory.make(settings.GSTREAMER_SINK, "audio-sink")
+        if self.playbin is None or sink is None:
+            raise ValueError(
+                f"could not create a playbin with {settings.GSTREAMER_SINK}"
+            )
+        if sink.find_property("sync") is not None:
+            # play in real time, also with sinks that do not output audio like fakesink
+            sink.set_property("sync", True)
+        self.playbin.set_property("audio-sink", sink)
+        # files might contain cover art, which is not shown
+        self.playbin.set_property(
+            "video-sink", Gst.ElementFactory.make("fakesink", None)
+        )
+        self.playbin.connect("about-to-finish", self._on_about_to_finish)
+
+        # serializes all commands that change the state of the playbin.
+        # It is never taken by GStreamer's threads, so it can be held during state changes.
+        self.transport_lock = RLock()
+        # guards all attributes below
+        # Never change the state of the playbin while holding this lock,
+        # state changes wait for the streaming thread that calls _on_about_to_finish
+        self.lock = Lock()
+        # the tracklist ids and uris of the current track and the tracks after it
+        self.tracklist: List[Tuple[int, str]] = []
+        # the tracklist id of the track that the playbin plays or is about to play
+        self.loaded: Optional[int] = None
+        self.next_tlid = 0
+        # the tracklist ids of the tracks that were loaded when an end-of-stream
+        # or an error was posted, by the sequence number of the message
+        self.finished: "cachetools.LRUCache[int, Optional[int]]" = cachetools.LRUCache(
+            maxsize=16
+        )
+
+        self.playbin.get_bus().set_sync_handler(self._on_sync_message)
+        self._watch_bus()
+
+    def _create_tlid(self) -> int:
+        # needs to be called while holding the lock
+        self.next_tlid += 1
+        return self.next_tlid
+
+    def _query_position(self) -> int:
+        success, position = self.playbin.query_position(Gst.Format.TIME)
+        return position // Gst.MSECOND if success else 0
+
+    def _query_length(self) -> Optional[int]:
+        success, duration = self.playbin.query_duration(Gst.Format.TIME)
+        return duration // Gst.MSECOND if success else None
+
+    def _start(self, tlid: int, uri: str, position: Optional[int] = None) -> None:
+        # plays the given track from the beginning or from the given position
+        # needs to be called while holding the transport lock
+        self.playbin.set_state(Gst.State.NULL)
+        with self.lock:
+            self.loaded = tlid
+        self.playbin.set_property("uri", uri)
+        if position is not None:
+            # seeking is only possible after the file was loaded
+            self.playbin.set_state(Gst.State.PAUSED)
+            self.playbin.get_state(Gst.SECOND)
+            self.playbin.seek_simple(
+                Gst.Format.TIME,
+                Gst.SeekFlags.FLUSH | Gst.SeekFlags.KEY_UNIT,
+                position * Gst.MSECOND,
+            )
+        if self.playbin.set_state(Gst.State.PLAYING) == Gst.StateChangeReturn.FAILURE:
+            logging.warning("could not play %s", uri)
+        self.status.started(tlid, self._query_length())
+        if position is not None:
+            self.status.seeked(position)
+
+    def _stop(self) -> None:
+        # needs to be called while holding the transport lock
+        self.playbin.set_state(Gst.State.NULL)
+        with self.lock:
+            self.loaded = None
+        self.status.state_changed("stopped")
+
+    def _advance(self, tlid: Optional[int]) -> None:
+        # ends the track with the given tracklist id and the tracks before it
+        # and starts the next one in the tracklist, if any.
+        # Does nothing if the track was already ended, e.g. by a concurrent skip.
+        with self.transport_lock:
+            with self.lock:
+                tlids = [track[0] for track in self.tracklist]
+                if tlid not in tlids:
+                    return
+                current = tlids[0]
+                del self.tracklist[: tlids.index(tlid) + 1]
+                following = self.tracklist[0] if self.tracklist else None
+            self.status.ended(current)
+            if following is None:
+                self._stop()
+            else:
+                self._start(*following)
+
+    def _on_about_to_finish(self, _playbin) -> None:
+        # called from a streaming thread shortly before the current track ends
+        with self.lock:
+            if len(self.tracklist) < 2:
+                return
+            self.loaded, uri = self.tracklist[1]
+        self.playbin.set_property("uri", uri)
+
+    def _on_sync_message(self, _bus, message):
+        # called in the thread that posts the message, before it is queued
+        if message.type in (Gst.MessageType.EOS, Gst.MessageType.ERROR):
+            with self.lock:
+                self.finished[message.get_seqnum()] = self.loaded
+        return Gst.BusSyncReply.PASS
+
+    def _on_stream_start(self) -> None:
+        # a track started, either by _start or gaplessly after the previous track
+        with self.lock:
+            tlids = [tlid for tlid, _ in self.tracklist]
+            if self.loaded not in tlids:
+                return
+            # the tracks before the loaded one are over
+            del self.tracklist[: tlids.index(self.loaded)]
+            tlid = self.loaded
+        if self.status.tlid != tlid:
+            self.status.started(tlid, self._query_length())
+
+    def _on_state_changed(self, message) -> None:
+        if message.src != self.playbin:
+            return
+        _, new, pending = message.parse_state_changed()
+        if pending != Gst.State.VOID_PENDING:
+            # the state is still changing
+            return
+        if new == Gst.State.PLAYING:
+            self.status.resumed_at(self._query_position())
+        elif new == Gst.State.PAUSED:
+            self.status.paused_at(self._query_position())
+
+    def _handle_message(self, message) -> None:
+        if message.type == Gst.MessageType.EOS:
+            with self.lock:
+                tlid = self.finished.pop(message.get_seqnum(), None)
+            self._advance(tlid)
+        elif message.type == Gst.MessageType.ERROR:
+            error, _ = message.parse_error()
+            logging.warning("error during playback: %s", error.message)
+            with self.lock:
+                tlid = self.finished.pop(message.get_seqnum(), None)
+            # skip the track, like mopidy does
+            self._advance(tlid)
+        elif message.type == Gst.MessageType.STREAM_START:
+            self._on_stream_start()
+        elif message.type == Gst.MessageType.STATE_CHANGED:
+            self._on_state_changed(message)
+        elif message.type == Gst.MessageType.DURATION_CHANGED:
+            self.status.length_changed(self._query_length())
+        elif message.type == Gst.MessageType.ASYNC_DONE:
+            # e.g. a seek finished
+            self.status.seeked(self._query_position())
+
+    @background_thread
+    def _watch_bus(self) -> None:
+        bus = self.playbin.get_bus()
+        while True:
+            message = bus.timed_pop(self.POSITION_INTERVAL * Gst.SECOND)
+            # As this function handles messages for the whole lifetime of the backend,
+            # we catch every exception to make sure the thread keeps running
+            try:
+                if message is None:
+                    if not self.status.paused():
+                        self.status.seeked(self._query_position())
+                    continue
+                self._handle_message(message)
+            except Exception as e:  # pylint: disable=broad-except
+                logging.exception("error while handling gstreamer messages: %s", e)
+
+    def handles(self, uri: str) -> bool:
+        return uri.startswith("file://")
+
+    def reset(self) -> None:
+        with self.transport_lock:
+            with self.lock:
+                self.tracklist = []
+            self.playbin.set_state(Gst.State.NULL)
+            with self.lock:
+                self.loaded = None
+            self.status.update("stopped", None, None, 0)
+
+    def play_song(self, uri: str, position: Optional[int] = None) -> Optional[int]:
+        with self.transport_lock:
+            with self.lock:
+                tlid = self._create_tlid()
+                self.tracklist = [(tlid, uri)]
+            self._start(tlid, uri, position)
+        return tlid
+
+    def enqueue(self, uri: str) -> Optional[int]:
+        with self.lock:
+            tlid = self._create_tlid()
+            self.tracklist.append((tlid, uri))
+        return tlid
+
+    def remove(self, tlid: int) -> bool:
+        with self.lock:
+            if tlid == self.loaded:
+                # the playbin already continues with this track
+                return False
+            self.tracklist = [track for track in self.tracklist if track[0] != tlid]
+        return True
+
+    def refresh_status(self) -> bool:
+        _, state, _ = self.playbin.get_state(0)
+        with self.lock:
+            tlid = self.tracklist[0][0] if self.tracklist else None
+        if state == Gst.State.PLAYING:
+            self.status.update(
+                "playing", tlid, self._query_length(), self._query_position()
+            )
+        elif state == Gst.State.PAUSED:
+            self.status.update(
+                "paused", tlid, self._query_length(), self._query_position()
+            )
+        else:
+            self.status.update("stopped", None, None, 0)
+        return True
+
+    def play(self) -> None:
+        with self.transport_lock:
+            with self.lock:
+                loaded = self.loaded
+            if loaded is not None:
+                self.playbin.set_state(Gst.State.PLAYING)
+
+    def pause(self) -> None:
+        with self.transport_lock:
+            with self.lock:
+                loaded = self.loaded
+            if loaded is not None:
+                self.playbin.set_state(Gst.State.PAUSED)
+
+    def seek(self, position: int) -> None:
+        self.playbin.seek_simple(
+            Gst.Format.TIME,
+            Gst.SeekFlags.FLUSH | Gst.SeekFlags.KEY_UNIT,
+            max(0, position) * Gst.MSECOND,
+        )
+
+    def next(self) -> None:
+        with self.transport_lock:
+            with self.lock:
+                current = self.tracklist[0][0] if self.tracklist else None
+            self._advance(current)
+
+    def get_volume(self) -> float:
+        return self.playbin.get_property("volume")
+
+    def set_volume(self, volume: float) -> None:
+        self.playbin.set_property("volume", volume)
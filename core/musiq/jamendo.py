@@ -202,17 +202,13 @@ class JamendoSongProvider(SongProvider, Jamendo):
             },
         )
 
-        for track in result["results"]:
-            external_url = track["shareurl"]
-            self.musiq.do_request_music(
-                "",
-                external_url,
-                None,
-                False,
-                "jamendo",
-                archive=False,
-                manually_requested=False,
-            )
+        providers = [
+            JamendoSongProvider(self.musiq, track["shareurl"], None)
+            for track in result["results"]
+        ]
+        SongProvider.request_many(
+            self.musiq, providers, "", archive=False, manually_requested=False
+        )
 
         return HttpResponse("queueing radio")
 
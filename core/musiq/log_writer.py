@@ -0,0 +1,99 @@
+"""This module collects play and request logs in memory and writes them in batches."""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import time
+from threading import Lock
+from typing import List, Optional, Tuple
+
+from core.models import ArchivedPlaylist, ArchivedSong, PlayLog, RequestLog
+from core.util import background_thread
+
+
+class LogWriter:
+    """Collects the logs of played and requested songs and writes them after a delay.
+    This way, logging does not delay song changes or requests,
+    and a burst of logs results in a single insert per table.
+    The creation time of the logs is the time they are written,
+    at most FLUSH_INTERVAL seconds after they happened."""
+
+    # seconds between the first log of a batch and writing the batch
+    FLUSH_INTERVAL = 10
+
+    def __init__(self) -> None:
+        # guards the attributes below
+        self.lock = Lock()
+        # (external url, manually requested, votes) of every played song
+        self.plays: List[Tuple[str, bool, Optional[int]]] = []
+        self.requests: List[RequestLog] = []
+        self.flush_scheduled = False
+        atexit.register(self.flush)
+
+    def _schedule(self) -> None:
+        # needs to be called while holding the lock
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self._flush_delayed()
+
+    def log_play(
+        self, external_url: str, manually_requested: bool, votes: Optional[int]
+    ) -> None:
+        """Logs that the song with the given url was played.
+        The song is only logged if it was archived."""
+        with self.lock:
+            self.plays.append((external_url, manually_requested, votes))
+            self._schedule()
+
+    def log_request(
+        self,
+        address: str,
+        song: Optional[ArchivedSong] = None,
+        playlist: Optional[ArchivedPlaylist] = None,
+    ) -> None:
+        """Logs that the given song or playlist was requested from the given address."""
+        with self.lock:
+            self.requests.append(
+                RequestLog(song=song, playlist=playlist, address=address)
+            )
+            self._schedule()
+
+    @background_thread
+    def _flush_delayed(self) -> None:
+        time.sleep(self.FLUSH_INTERVAL)
+        try:
+            self.flush()
+        except Exception as e:  # pylint: disable=broad-except
+            logging.exception("error while writing logs: %s", e)
+
+    def flush(self) -> None:
+        """Writes all collected logs to the database."""
+        with self.lock:
+            plays, self.plays = self.plays, []
+            requests, self.requests = self.requests, []
+            self.flush_scheduled = False
+
+        if plays:
+            # look up all played songs at once
+            archived_songs = ArchivedSong.objects.in_bulk(
+                {url for url, _, _ in plays}, field_name="url"
+            )
+            play_logs = []
+            for url, manually_requested, votes in plays:
+                archived_song = archived_songs.get(url)
+                if archived_song is not None:
+                    play_logs.append(
+                        PlayLog(
+                            song=archived_song,
+                            manually_requested=manually_requested,
+                            votes=votes,
+                        )
+                    )
+            PlayLog.objects.bulk_create(play_logs)
+
+        if requests:
+            RequestLog.objects.bulk_create(requests)
+
+
+log_writer = LogWriter()
@@ -0,0 +1,142 @@
+"""This module contains the backend that plays songs with mopidy."""
+
+from __future__ import annotations
+
+import logging
+from threading import Event
+from typing import Any, List, Optional
+
+import requests
+from django.conf import settings
+from mopidyapi.client import MopidyAPI
+from mopidyapi.exceptions import MopidyError
+
+from core.musiq.mopidy_batch import MopidyBatch
+from core.musiq.player_backend import PlayerBackend
+
+
+class MopidyBackend(PlayerBackend):
+    """Plays songs with mopidy, using its HTTP API.
+    Mopidy can play every uri that raveberry uses, including Spotify and Soundcloud."""
+
+    def __init__(self) -> None:
+        super().__init__("mopidy")
+        self.player: MopidyAPI = MopidyAPI(host=settings.MOPIDY_HOST)
+        # set whenever the playback state changes
+        self.playing = Event()
+
+        self.player.add_callback(
+            "track_playback_started",
+            lambda event: self.status.started(
+                event.tl_track.tlid, getattr(event.tl_track.track, "length", None)
+            ),
+        )
+        self.player.add_callback(
+            "track_playback_paused",
+            lambda event: self.status.paused_at(event.time_position),
+        )
+        self.player.add_callback(
+            "track_playback_resumed",
+            lambda event: self.status.resumed_at(event.time_position),
+        )
+        self.player.add_callback(
+            "track_playback_ended", lambda event: self.status.ended(event.tl_track.tlid)
+        )
+        self.player.add_callback(
+            "seeked", lambda event: self.status.seeked(event.time_position)
+        )
+        self.player.add_callback("playback_state_changed", self._on_state_changed)
+
+    def _on_state_changed(self, event) -> None:
+        self.status.state_changed(event.new_state)
+        self.playing.set()
+
+    def _query_status(self, batch: Optional[MopidyBatch] = None) -> List[Any]:
+        # Updates the status with mopidy's actual status.
+        # The commands in the given batch are executed before, in the same request.
+        # Returns the results of these commands.
+        if batch is None:
+            batch = MopidyBatch(self.player)
+        batch.add("core.playback.get_state")
+        batch.add("core.playback.get_current_tlid")
+        batch.add("core.playback.get_current_track")
+        batch.add("core.playback.get_time_position")
+        *results, state, tlid, track, position = batch.send()
+        self.status.update(
+            state,
+            tlid,
+            None if track is None else getattr(track, "length", None),
+            position,
+        )
+        return results
+
+    def handles(self, uri: str) -> bool:
+        return True
+
+    def reset(self) -> None:
+        batch = MopidyBatch(self.player)
+        batch.add("core.playback.stop")
+        batch.add("core.tracklist.clear")
+        # make songs disappear from tracklist after being played
+        batch.add("core.tracklist.set_consume", value=True)
+        self._query_status(batch)
+
+    def play_song(self, uri: str, position: Optional[int] = None) -> Optional[int]:
+        # starting the song only takes a single request
+        batch = MopidyBatch(self.player)
+        batch.add("core.tracklist.clear")
+        # after a restart consume may be set to False again, so make sure it is on
+        batch.add("core.tracklist.set_consume", value=True)
+        batch.add("core.tracklist.add", uris=[uri])
+        batch.add("core.playback.play")
+        if position is not None:
+            self.playing.clear()
+            batch.send()
+            # mopidy can only seek when the song is playing
+            self.playing.wait(timeout=1)
+            batch.add("core.playback.seek", time_position=position)
+        self._query_status(batch)
+        return self.status.tlid
+
+    def enqueue(self, uri: str) -> Optional[int]:
+        try:
+            tl_tracks = self.player.tracklist.add(uris=[uri])
+        except (requests.exceptions.ConnectionError, MopidyError) as e:
+            logging.warning("could not add %s to the tracklist: %s", uri, e)
+            return None
+        if not tl_tracks:
+            return None
+        return tl_tracks[0].tlid
+
+    def remove(self, tlid: int) -> bool:
+        try:
+            self.player.tracklist.remove(criteria={"tlid": [tlid]})
+        except (requests.exceptions.ConnectionError, MopidyError) as e:
+            logging.warning("could not remove track %d: %s", tlid, e)
+            return False
+        return True
+
+    def refresh_status(self) -> bool:
+        try:
+            self._query_status()
+        except (requests.exceptions.ConnectionError, MopidyError):
+            return False
+        return True
+
+    def play(self) -> None:
+        self.player.playback.play()
+
+    def pause(self) -> None:
+        self.player.playback.pause()
+
+    def seek(self, position: int) -> None:
+        self.player.playback.seek(position)
+
+    def next(self) -> None:
+        self.player.playback.next()
+
+    def get_volume(self) -> float:
+        return self.player.mixer.get_volume() / 100
+
+    def set_volume(self, volume: float) -> None:
+        self.player.mixer.set_volume(round(volume * 100))
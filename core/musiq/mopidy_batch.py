@@ -0,0 +1,61 @@
+"""This module sends several mopidy commands in a single request."""
+
+from __future__ import annotations
+
+from json.decoder import JSONDecodeError
+from typing import Any, Dict, List, TYPE_CHECKING
+
+import requests
+from mopidyapi.exceptions import MopidyError
+from mopidyapi.parsedata import deserialize_mopidy, serialize_mopidy
+
+if TYPE_CHECKING:
+    from mopidyapi.client import MopidyAPI
+
+
+class MopidyBatch:
+    """Collects mopidy commands and sends them as one JSON-RPC batch request.
+    Mopidy executes the commands of a batch in the given order,
+    so a sequence of commands only costs a single round trip.
+    Use it like this:
+    batch = MopidyBatch(player)
+    batch.add("core.tracklist.clear")
+    batch.add("core.playback.play")
+    clear_result, play_result = batch.send()"""
+
+    def __init__(self, player: "MopidyAPI") -> None:
+        self.url = player.http_url
+        self.calls: List[Dict[str, Any]] = []
+
+    def add(self, method: str, **params: Any) -> None:
+        """Appends a call of the given method, e.g. core.playback.play, to the batch."""
+        call: Dict[str, Any] = {
+            "jsonrpc": "2.0",
+            "id": len(self.calls),
+            "method": method,
+        }
+        if params:
+            call["params"] = serialize_mopidy(params)
+        self.calls.append(call)
+
+    def send(self) -> List[Any]:
+        """Sends all collected calls and returns their results in the same order.
+        Raises a MopidyError if any of the calls failed."""
+        if not self.calls:
+            return []
+        count = len(self.calls)
+        try:
+            responses = requests.post(self.url, json=self.calls).json()
+        except JSONDecodeError as e:
+            raise requests.exceptions.ConnectionError(e)
+        self.calls = []
+
+        results: List[Any] = [None] * count
+        for response in responses:
+            if "error" in response:
+                message = response["error"].get("data", {}).get("message")
+                raise MopidyError(
+                    message or response["error"].get("message", "unknown error")
+                )
+            results[response["id"]] = deserialize_mopidy(response["result"])
+        return results
@@ -2,9 +2,8 @@
 
 from __future__ import annotations
 
-from typing import Optional, TYPE_CHECKING
+from typing import Callable, Optional, TYPE_CHECKING
 
-from core.models import ArchivedSong
 from core.util import background_thread
 
 if TYPE_CHECKING:
@@ -51,6 +50,11 @@ class MusicProvider:
         """Returns whether this resource is available online."""
         raise NotImplementedError()
 
+    def check_new_music(self) -> bool:
+        """Returns whether this resource may be requested if only new music is allowed.
+        Only accesses the database, so it is cheap compared to check_available."""
+        return True
+
     def enqueue_placeholder(self, manually_requested) -> None:
         """Enqueues a placeholder if applicable. Playlists have no placeholder, only songs do.
         Used to identify this resource in the client after a request."""
@@ -87,11 +91,29 @@ class MusicProvider:
         if (
             0
             < self.musiq.base.settings.basic.max_queue_length
-            <= self.musiq.queue.count()
+            <= self.musiq.queue.song_count()
         ):
             self.error = "Queue limit reached"
             raise ProviderError(self.error)
 
+        enqueue_function = self.prepare_request(request_ip, archive=archive)
+
+        self.enqueue_placeholder(manually_requested)
+
+        @background_thread
+        def enqueue_in_background() -> None:
+            enqueue_function()
+
+        enqueue_in_background()
+
+    def prepare_request(
+        self, request_ip: str, archive: bool = True
+    ) -> Callable[[], None]:
+        """Checks whether this resource can be requested.
+        Raises a ProviderError if it can not.
+        Returns the function that makes this resource available and enqueues it.
+        It should be called in the background after the placeholder was created."""
+
         def enqueue() -> None:
             self.persist(request_ip, archive=archive)
             self.enqueue()
@@ -119,23 +141,8 @@ class MusicProvider:
 
             enqueue_function = fetch_enqueue
 
-        from core.musiq.song_provider import SongProvider
-
-        if self.musiq.base.settings.basic.new_music_only and isinstance(
-            self, SongProvider
-        ):
-            try:
-                archived_song = ArchivedSong.objects.get(url=self.get_external_url())
-                if archived_song.counter > 0:
-                    self.error = "Only new music is allowed!"
-                    raise ProviderError(self.error)
-            except ArchivedSong.DoesNotExist:
-                pass
-
-        self.enqueue_placeholder(manually_requested)
-
-        @background_thread
-        def enqueue_in_background() -> None:
-            enqueue_function()
+        # the external url of a search is only known after checking its availability
+        if not self.check_new_music():
+            raise ProviderError(self.error)
 
-        enqueue_in_background()
+        return enqueue_function
@@ -6,9 +6,10 @@ import logging
 from typing import Any, Dict, Optional, Union, TYPE_CHECKING, List, Tuple, cast, Type
 
 import ipware
+from django.conf import settings
 from django.core.handlers.wsgi import WSGIRequest
 from django.forms.models import model_to_dict
-from django.http import HttpResponseBadRequest
+from django.http import HttpResponseBadRequest, HttpResponseForbidden
 from django.http.response import HttpResponse, JsonResponse
 from django.shortcuts import render
 from django.urls import URLPattern
@@ -245,9 +246,47 @@ class Musiq(Stateful):
         context["embed_stream"] = self.base.settings.basic.embed_stream
         return render(request, "musiq.html", context)
 
-    def state_dict(self) -> Dict[str, Any]:
-        state_dict = self.base.state_dict()
+    def _song_dicts(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        # returns the serialized songs in the given slice of the queue, as seen by clients
+        return self.queue.song_dicts(
+            start, stop, ranked=self.base.settings.basic.voting_system
+        )
+
+    def queue_page(self, request: WSGIRequest) -> HttpResponse:
+        """Returns a part of the queue.
+        The state only contains the beginning of the queue,
+        clients use this endpoint to show more songs."""
+        try:
+            start = int(request.GET.get("start", 0))
+            count = int(request.GET.get("count", settings.QUEUE_WINDOW_SIZE))
+        except ValueError:
+            return HttpResponseBadRequest("start and count need to be integers")
+        if start < 0 or count < 0:
+            return HttpResponseBadRequest("start and count need to be positive")
+        count = min(count, settings.QUEUE_PAGE_MAX_SIZE)
+        return JsonResponse(
+            {
+                "songs": self._song_dicts(start, start + count),
+                "queueLength": self.queue.song_count(),
+            }
+        )
 
+    def player_statistics(self, request: WSGIRequest) -> HttpResponse:
+        """Returns how long commands waited for access to each player backend.
+        Only admin is permitted to see this."""
+        if not self.base.user_manager.is_admin(request.user):
+            return HttpResponseForbidden()
+        return JsonResponse(
+            {
+                backend.name: backend.access.get_statistics()
+                for backend in self.playback.backends
+            }
+        )
+
+    def base_stateful(self) -> Stateful:
+        return self.base
+
+    def page_state_dict(self) -> Dict[str, Any]:
         musiq_state = {}
         current_song: Optional[Dict[str, Any]]
         try:
@@ -259,22 +298,13 @@ class Musiq(Stateful):
         except CurrentSong.DoesNotExist:
             current_song = None
 
-        song_queue = []
-        total_time = 0
-        all_songs = self.queue.all()
-        if self.base.settings.basic.voting_system:
-            all_songs = all_songs.order_by("-votes", "index")
-        for song in all_songs:
-            song_dict = model_to_dict(song)
-            song_dict = util.camelize(song_dict)
-            total_time += song_dict["duration"]
-            song_dict["durationFormatted"] = song_utils.format_seconds(
-                song_dict["duration"]
-            )
-            song_queue.append(song_dict)
-        musiq_state["totalTimeFormatted"] = song_utils.format_seconds(total_time)
+        song_queue = self._song_dicts(0, settings.QUEUE_WINDOW_SIZE)
+        musiq_state["queueLength"] = self.queue.song_count()
+        musiq_state["totalTimeFormatted"] = song_utils.format_seconds(
+            self.queue.total_duration()
+        )
 
-        if state_dict["alarm"]:
+        if self.playback.alarm_playing.is_set():
             musiq_state["current_song"] = {
                 "queueKey": -1,
                 "manuallyRequested": False,
@@ -308,5 +338,4 @@ class Musiq(Stateful):
         musiq_state["volume"] = self.controller.volume
         musiq_state["songQueue"] = song_queue
 
-        state_dict["musiq"] = musiq_state
-        return state_dict
+        return {"musiq": musiq_state}
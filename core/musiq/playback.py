@@ -6,20 +6,20 @@ import logging
 import os
 import random
 import time
-from contextlib import contextmanager
 from threading import Event
 from threading import Lock
 from threading import Semaphore
-from typing import Iterator, Optional, TYPE_CHECKING
+from typing import List, Optional, Tuple, TYPE_CHECKING
 
-import requests
+import cachetools
 from django.conf import settings
-from django.db import transaction
 from django.utils import timezone
-from mopidyapi.client import MopidyAPI
-from mopidyapi.exceptions import MopidyError
 
 import core.models as models
+from core.musiq.log_writer import log_writer
+from core.musiq.mopidy_backend import MopidyBackend
+from core.musiq.player_backend import PlayerBackend
+from core.musiq.player_status import PlayerStatus
 from core.musiq.song_provider import SongProvider
 from core.util import background_thread
 
@@ -36,6 +36,10 @@ class Playback:
     # placeholders do not count towards the internal counter
     queue_semaphore: Semaphore = None  # type: ignore
 
+    # seconds between queries of the player's status while waiting for the end of a song,
+    # in case the event that signals the end got lost
+    WATCHDOG_INTERVAL = 5
+
     def __init__(self, musiq: "Musiq") -> None:
         self.musiq = musiq
 
@@ -44,42 +48,70 @@ class Playback:
         self.backup_playing: Event = Event()
         self.running = True
 
-        self.player: MopidyAPI = MopidyAPI(host=settings.MOPIDY_HOST)
-        self.player_lock = Lock()
+        self.mopidy = MopidyBackend()
+        # the backends in the order they are tried for each song
+        self.backends: List[PlayerBackend] = [self.mopidy]
+        if settings.GSTREAMER_PLAYBACK:
+            try:
+                from core.musiq.gstreamer_backend import GStreamerBackend
+
+                self.backends.insert(0, GStreamerBackend())
+            except (ModuleNotFoundError, ValueError) as e:
+                logging.warning("GStreamer playback is not available: %s", e)
+        # the backend that plays the current song
+        self.backend: PlayerBackend = self.mopidy
+        # the queue key and the tracklist id of the song that was added
+        # to the backend's tracklist after the current song (see PLAYBACK_LOOKAHEAD)
+        self.preloaded: Optional[Tuple[int, int]] = None
+        # guards the suggestions below
+        self.suggestions_lock = Lock()
+        # autoplay suggestions that were looked up in advance, by the url of their song
+        self.suggestions: "cachetools.LRUCache[str, str]" = cachetools.LRUCache(
+            maxsize=16
+        )
 
     def start(self) -> None:
+        self.queue.load()
         self.queue.delete_placeholders()
-        Playback.queue_semaphore = Semaphore(self.queue.count())
+        Playback.queue_semaphore = Semaphore(self.queue.song_count())
 
-        with self.mopidy_command(important=True):
-            self.player.playback.stop()
-            self.player.tracklist.clear()
-            # make songs disappear from tracklist after being played
-            self.player.tracklist.set_consume(True)
+        for backend in self.backends:
+            with backend.command(important=True):
+                backend.reset()
         self._loop()
 
+    @property
+    def status(self) -> PlayerStatus:
+        """The status of the backend that plays the current song."""
+        return self.backend.status
+
+    def _backend_for(self, uri: str) -> PlayerBackend:
+        # returns the first backend that can play the given uri
+        for backend in self.backends:
+            if backend.handles(uri):
+                return backend
+        return self.mopidy
+
+    def _switch_backend(self, uri: str) -> PlayerBackend:
+        # makes the backend for the given uri the current one
+        # and stops the previous one, which might still play a song
+        backend = self._backend_for(uri)
+        if backend is not self.backend:
+            with self.backend.command(important=True):
+                self.backend.reset()
+                self.preloaded = None
+            self.backend = backend
+        return backend
+
     def progress(self) -> float:
         """Returns how far into the current song the playback is, in percent."""
-        # the state is either pause or stop
-        current_position = 0
-        duration = 1
-        with self.mopidy_command() as allowed:
-            if allowed:
-                current_position = self.player.playback.get_time_position()
-                current_track = self.player.playback.get_current_track()
-                if current_track is None or self.backup_playing.is_set():
-                    return 0
-                duration = current_track.length
-        return 100 * current_position / duration
+        if self.backup_playing.is_set():
+            return 0
+        return self.status.progress()
 
     def paused(self) -> bool:
         """Returns whether playback is currently paused."""
-        # the state is either pause or stop
-        paused = False
-        with self.mopidy_command() as allowed:
-            if allowed:
-                paused = self.player.playback.get_state() != "playing"
-        return paused
+        return self.status.paused()
 
     @background_thread
     def _loop(self) -> None:
@@ -88,6 +120,7 @@ class Playback:
         while True:
 
             catch_up = None
+            already_playing = False
             if models.CurrentSong.objects.exists():
                 # recover interrupted song from database
                 current_song = models.CurrentSong.objects.get()
@@ -103,6 +136,8 @@ class Playback:
                 if catch_up > duration * 1000:
                     catch_up = -1
             else:
+                if settings.PLAYBACK_LOOKAHEAD:
+                    self._discard_preloaded()
                 self.queue_semaphore.acquire()
                 if not self.running:
                     break
@@ -110,25 +145,24 @@ class Playback:
                 if self.backup_playing.is_set():
                     # stop backup stream
                     self.backup_playing.clear()
-                    with self.mopidy_command(important=True) as allowed:
+                    with self.backend.command(important=True) as allowed:
                         if allowed:
-                            self.player.playback.next()
-
-                # select the next song depending on settings
-                song: Optional[models.QueuedSong]
-                if self.musiq.base.settings.basic.voting_system:
-                    with transaction.atomic():
-                        song = self.queue.confirmed().order_by("-votes", "index")[0]
-                        song_id = song.id
-                        self.queue.remove(song.id)
-                elif self.musiq.controller.shuffle:
-                    confirmed = self.queue.confirmed()
-                    index = random.randint(0, confirmed.count() - 1)
-                    song_id = confirmed[index].id
-                    song = self.queue.remove(song_id)
-                else:
-                    # move the first song in the queue into the current song
-                    song_id, song = self.queue.dequeue()
+                            self.backend.next()
+
+                song: Optional[models.QueuedSong] = None
+                if self.preloaded and self.status.tlid == self.preloaded[1]:
+                    # the backend already started the preloaded song, it becomes the current song
+                    song_id, song = self.queue.dequeue_key(self.preloaded[0])
+                    already_playing = song is not None
+                if song is None:
+                    # select the next song depending on settings
+                    if self.musiq.base.settings.basic.voting_system:
+                        song_id, song = self.queue.dequeue_most_voted()
+                    elif self.musiq.controller.shuffle:
+                        song_id, song = self.queue.dequeue_random()
+                    else:
+                        # move the first song in the queue into the current song
+                        song_id, song = self.queue.dequeue()
 
                 if song is None:
                     # either the semaphore didn't match up with the actual count
@@ -150,45 +184,38 @@ class Playback:
 
                 self.handle_autoplay()
 
-                try:
-                    archived_song = models.ArchivedSong.objects.get(
-                        url=current_song.external_url
-                    )
+                if self.musiq.base.settings.basic.logging_enabled:
                     votes: Optional[int]
                     if self.musiq.base.settings.basic.voting_system:
                         votes = current_song.votes
                     else:
                         votes = None
-                    if self.musiq.base.settings.basic.logging_enabled:
-                        models.PlayLog.objects.create(
-                            song=archived_song,
-                            manually_requested=current_song.manually_requested,
-                            votes=votes,
-                        )
-                except (
-                    models.ArchivedSong.DoesNotExist,
-                    models.ArchivedSong.MultipleObjectsReturned,
-                ):
-                    pass
-
-            self.musiq.update_state()
-
-            playing = Event()
+                    log_writer.log_play(
+                        current_song.external_url,
+                        current_song.manually_requested,
+                        votes,
+                    )
 
-            @self.player.on_event("playback_state_changed")
-            def _on_playback_state_changed(_event):
-                playing.set()
+            self.musiq.update_state(immediate=True)
 
-            with self.mopidy_command(important=True):
-                # after a restart consume may be set to False again, so make sure it is on
-                self.player.tracklist.clear()
-                self.player.tracklist.set_consume(True)
-                self.player.tracklist.add(uris=[current_song.internal_url])
-                self.player.playback.play()
-                # mopidy can only seek when the song is playing
-                started_playing = playing.wait(timeout=1)
-                if catch_up is not None and catch_up >= 0:
-                    self.player.playback.seek(catch_up)
+            if already_playing:
+                # the backend continued with the preloaded song without a gap
+                assert self.preloaded
+                tlid: Optional[int] = self.preloaded[1]
+                self.preloaded = None
+            else:
+                backend = self._switch_backend(current_song.internal_url)
+                with backend.command(important=True):
+                    self.preloaded = None
+                    tlid = backend.play_song(
+                        current_song.internal_url,
+                        position=catch_up
+                        if catch_up is not None and catch_up >= 0
+                        else None,
+                    )
+                if tlid is None:
+                    # the song is skipped instead of waiting for its end
+                    logging.warning("could not play %s", current_song.internal_url)
 
                 # needs some more testing but could prevent "eating the queue" bug
                 # if not started_playing and not settings.DOCKER:
@@ -202,10 +229,20 @@ class Playback:
                 #    # recover the current song by restarting the loop
                 #    continue
 
-            self.musiq.update_state()
+            self.musiq.update_state(immediate=True)
+
+            # while this song plays, prepare autoplay for when the last song starts
+            self._prepare_autoplay()
+
+            # decide beforehand whether the alarm is played after this song,
+            # so no song is preloaded in that case
+            play_alarm = (
+                self.musiq.base.user_manager.partymode_enabled()
+                and random.random() < self.musiq.base.settings.basic.alarm_probability
+            )
 
-            if catch_up is None or catch_up >= 0:
-                if not self._wait_until_song_end():
+            if tlid is not None and (catch_up is None or catch_up >= 0):
+                if not self._wait_until_song_end(tlid, preload=not play_alarm):
                     # there was a ConnectionError during waiting for the song to end
                     # we do not delete the current song but recover its state by restarting the loop
                     continue
@@ -219,68 +256,157 @@ class Playback:
                 self.queue.enqueue(song_provider.get_metadata(), False)
                 self.queue_semaphore.release()
 
-            if (
-                self.musiq.base.user_manager.partymode_enabled()
-                and random.random() < self.musiq.base.settings.basic.alarm_probability
-            ):
+            if play_alarm:
                 self.alarm_playing.set()
                 self.musiq.base.lights.alarm_started()
 
-                self.musiq.update_state()
+                self.musiq.update_state(immediate=True)
 
-                with self.mopidy_command(important=True):
-                    self.player.tracklist.add(
-                        uris=[
-                            "file://"
-                            + os.path.join(settings.BASE_DIR, "config/sounds/alarm.m4a")
-                        ]
-                    )
-                    self.player.playback.play()
-                playing.clear()
-                playing.wait(timeout=1)
-                self._wait_until_song_end()
+                alarm_uri = "file://" + os.path.join(
+                    settings.BASE_DIR, "config/sounds/alarm.m4a"
+                )
+                backend = self._switch_backend(alarm_uri)
+                with backend.command(important=True):
+                    tlid = backend.play_song(alarm_uri)
+                if tlid is None:
+                    logging.warning("could not play the alarm")
+                else:
+                    self._wait_until_song_end(tlid)
 
                 self.musiq.base.lights.alarm_stopped()
-                self.musiq.update_state()
+                self.musiq.update_state(immediate=True)
                 self.alarm_playing.clear()
 
-            if not self.queue.exists() and self.musiq.base.settings.sound.backup_stream:
+            if (
+                self.queue.song_count() == 0
+                and self.musiq.base.settings.sound.backup_stream
+            ):
                 self.backup_playing.set()
                 # play backup stream
-                self.player.tracklist.add(
-                    uris=[self.musiq.base.settings.sound.backup_stream]
-                )
-                self.player.playback.play()
-
-            self.musiq.update_state()
-
-    def _wait_until_song_end(self) -> bool:
-        """Wait until the song is over.
+                backup_stream = self.musiq.base.settings.sound.backup_stream
+                backend = self._switch_backend(backup_stream)
+                with backend.command(important=True):
+                    backend.play_song(backup_stream)
+
+            self.musiq.update_state(immediate=True)
+
+    def _wait_until_song_end(self, tlid: int, preload: bool = False) -> bool:
+        """Wait until the song with the given tracklist id is over.
+        The song is also over when the player stopped, e.g. because the song failed to play.
+        If :param preload: is set and PLAYBACK_LOOKAHEAD is enabled,
+        the next song is added to the backend's tracklist shortly before the end.
         Returns True when finished without errors, False otherwise."""
-        # This is the event based approach. Unfortunately too error-prone.
-        # playback_ended = Event()
-        # @self.player.on_event('tracklist_changed')
-        # def on_tracklist_change(event):
-        #     playback_ended.set()
-        # playback_ended.wait()
+        # the backend's events tell when the song ended.
+        # Since events can get lost, e.g. when the connection to mopidy is interrupted,
+        # the actual status is queried after the event and every few seconds without one.
         error = False
+        last_query = time.time()
         while True:
-            with self.mopidy_command() as allowed:
+            timeout: float = self.WATCHDOG_INTERVAL
+            if preload and settings.PLAYBACK_LOOKAHEAD:
+                remaining = self.status.remaining()
+                if remaining is not None:
+                    until_preload = remaining / 1000 - settings.PLAYBACK_LOOKAHEAD_TIME
+                    if until_preload <= 0:
+                        self._preload()
+                        # regularly check whether the preloaded song is still queued
+                        timeout = 1
+                    else:
+                        timeout = min(timeout, until_preload)
+            changed = self.status.wait_for_track_change(tlid, timeout)
+            if not changed and time.time() - last_query < self.WATCHDOG_INTERVAL:
+                continue
+            last_query = time.time()
+            with self.backend.command(read_only=True) as allowed:
                 if allowed:
-                    try:
-                        if self.player.playback.get_state() == "stopped":
-                            break
-                    except (requests.exceptions.ConnectionError, MopidyError):
+                    if not self.backend.refresh_status():
                         # error during state get, skip until reconnected
                         error = True
-            time.sleep(0.1)
+                    elif self.status.tlid != tlid or self.status.state == "stopped":
+                        break
+            if error:
+                # do not query a disconnected player in a busy loop
+                time.sleep(0.1)
         return not error
 
+    def _peek_next(self) -> Optional[models.QueuedSong]:
+        # returns the song that will be played next, without removing it from the queue
+        if self.musiq.base.settings.basic.voting_system:
+            return self.queue.peek_most_voted()
+        if self.musiq.controller.shuffle:
+            return self.queue.peek_random()
+        return self.queue.peek()
+
+    def _discard_preloaded(self) -> None:
+        # removes the preloaded song from the backend's tracklist
+        # if it was removed from the queue in the meantime
+        if self.preloaded is None:
+            return
+        key, tlid = self.preloaded
+        if self.queue.contains(key):
+            return
+        with self.backend.command() as allowed:
+            if allowed and self.backend.remove(tlid):
+                self.preloaded = None
+
+    def _preload(self) -> None:
+        """Adds the song that is played next to the backend's tracklist, after the current song.
+        This way, the backend continues with it without a gap.
+        The song stays in the queue until the backend started it."""
+        self._discard_preloaded()
+        if self.preloaded is not None:
+            return
+        song = self._peek_next()
+        if song is None:
+            return
+        if self._backend_for(song.internal_url) is not self.backend:
+            # the song can only continue gaplessly in the same backend
+            return
+        with self.backend.command() as allowed:
+            if allowed:
+                tlid = self.backend.enqueue(song.internal_url)
+                if tlid is not None:
+                    self.preloaded = (song.id, tlid)
+
+    def _get_suggestion(self, url: str) -> Optional[str]:
+        # looks up the song that autoplay adds after the song with the given url
+        # As this function can raise several exceptions (it might do networking)
+        # we catch every exception to make sure the calling thread keeps running
+        try:
+            provider = SongProvider.create(self.musiq, external_url=url)
+            return provider.get_suggestion()
+        except Exception as e:  # pylint: disable=broad-except
+            logging.exception("error during suggestions for %s: %s", url, e)
+            return None
+
+    @background_thread
+    def _prepare_suggestion(self, url: str) -> None:
+        with self.suggestions_lock:
+            if url in self.suggestions:
+                return
+        suggestion = self._get_suggestion(url)
+        if suggestion is not None:
+            with self.suggestions_lock:
+                self.suggestions[url] = suggestion
+
+    def _prepare_autoplay(self) -> None:
+        """Looks up the autoplay suggestion for the last song in the queue in the background,
+        so it is ready when this song is played and autoplay needs to add a song."""
+        if not self.musiq.controller.autoplay or self.queue.song_count() != 1:
+            return
+        song = self._peek_next()
+        if song is None or not song.external_url:
+            # the song is not available yet, its suggestion is looked up when needed
+            return
+        self._prepare_suggestion(song.external_url)
+
     def handle_autoplay(self, url: Optional[str] = None) -> None:
         """Checks whether to add a song by autoplay and does so if necessary.
         :param url: if given, this url is used to find the next autoplayed song.
-        Otherwise, the current song is used."""
-        if self.musiq.controller.autoplay and models.QueuedSong.objects.count() == 0:
+        Otherwise, the current song is used.
+        The suggestion is looked up, unless it was prepared in advance, and enqueued
+        in the background, so this method does not block on the network."""
+        if self.musiq.controller.autoplay and self.queue.song_count() == 0:
             if url is None:
                 # if no url was specified, use the one of the current song
                 try:
@@ -292,44 +418,37 @@ class Playback:
                 ):
                     return
 
-            provider = SongProvider.create(self.musiq, external_url=url)
-            try:
-                suggestion = provider.get_suggestion()
-                # The player loop is not restarted after error automatically.
-                # As this function can raise several exceptions (it might do networking)
-                # we catch every exception to make sure the loop keeps running
-            except Exception as e:  # pylint: disable=broad-except
-                logging.exception("error during suggestions for %s: %s", url, e)
-            else:
-                self.musiq.do_request_music(
-                    "",
-                    suggestion,
-                    None,
-                    False,
-                    provider.type,
-                    archive=False,
-                    manually_requested=False,
-                )
+            with self.suggestions_lock:
+                suggestion = self.suggestions.pop(url, None)
+            self._autoplay_in_background(url, suggestion)
 
-    @contextmanager
-    def mopidy_command(self, important: bool = False) -> Iterator[bool]:
-        """A context that should be used around every mopidy command used.
-        Makes sure that commands occur sequentially, as mopidy can not handle parallel inputs.
-        Use it like this:
-        with self.mopidy_command() as allowed:
-            if allowed:
-                # mopidy command
-        :param important: If True, wait until the lock is released.
-        If not, return 'False' after a timeout."""
-        timeout = 3
-        if important:
-            timeout = -1
-        if self.player_lock.acquire(timeout=timeout):
-            yield True
-            self.player_lock.release()
-        else:
-            logging.warning("mopidy command could not be executed")
-            yield False
+    @background_thread
+    def _autoplay_in_background(self, url: str, suggestion: Optional[str]) -> None:
+        if suggestion is None:
+            suggestion = self._get_suggestion(url)
+            # songs might have been enqueued while looking up the suggestion
+            if suggestion is None or self.queue.song_count() != 0:
+                return
+        self._enqueue_suggestion(suggestion)
+
+    def _enqueue_suggestion(self, suggestion: str) -> None:
+        # the suggestion is enqueued the same way playlists and radios are
+        try:
+            suggested_provider = SongProvider.create(
+                self.musiq, external_url=suggestion
+            )
+        except NotImplementedError as e:
+            logging.warning("cannot autoplay %s: %s", suggestion, e)
+            return
+        SongProvider.request_many(
+            self.musiq,
+            [suggested_provider],
+            "",
+            archive=False,
+            manually_requested=False,
+        )
+        # autoplay usually continues with the suggested song, so look up its suggestion now
+        self._prepare_suggestion(suggestion)
 
     def start_loop(self) -> None:
         """Starts the playback main loop, only used for tests."""
@@ -0,0 +1,125 @@
+"""This module coordinates the access of several threads to a player."""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Condition
+from typing import Deque, Dict, Iterator, Optional
+
+
+class PlayerAccess:
+    """A readers-writer lock around a player backend.
+    Commands that change the player's state (writes) are executed one after another,
+    in the order they were issued. Queries that only read the player's state
+    can be executed concurrently, as long as no write is in progress.
+    Waiting writes take precedence over new reads, so queries can not starve commands.
+    The time spent waiting for the lock is recorded for both kinds of access."""
+
+    # seconds after which unimportant accesses give up waiting
+    TIMEOUT = 3
+
+    def __init__(self) -> None:
+        # guards all attributes below
+        self.condition = Condition()
+        # the number of reads in progress
+        self.readers = 0
+        self.writing = False
+        # one token per waiting write, in the order the writes were issued
+        self.waiting_writers: Deque[object] = deque()
+        # for reads and writes: how often the lock was acquired, how often
+        # an access was dropped and the total and maximum waiting time in seconds
+        self.statistics: Dict[str, Dict[str, float]] = {
+            kind: {"acquired": 0, "dropped": 0, "total_wait": 0, "max_wait": 0}
+            for kind in ("read", "write")
+        }
+
+    def _record(self, kind: str, acquired: bool, wait: float) -> None:
+        # needs to be called while holding the condition
+        statistics = self.statistics[kind]
+        statistics["acquired" if acquired else "dropped"] += 1
+        statistics["total_wait"] += wait
+        statistics["max_wait"] = max(statistics["max_wait"], wait)
+        if not acquired:
+            logging.warning(
+                "player %s could not be executed after waiting %.1fs", kind, wait
+            )
+
+    @contextmanager
+    def read(self, important: bool = False) -> Iterator[bool]:
+        """A context for queries that do not change the player's state.
+        Yields whether the query may be executed.
+        :param important: If True, wait until all writes are finished.
+        If not, yield False after a timeout."""
+        timeout: Optional[float] = None if important else self.TIMEOUT
+        start = time.time()
+        with self.condition:
+            acquired = self.condition.wait_for(
+                lambda: not self.writing and not self.waiting_writers, timeout
+            )
+            if acquired:
+                self.readers += 1
+            self._record("read", acquired, time.time() - start)
+        if not acquired:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if self.readers == 0:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def write(self, important: bool = False) -> Iterator[bool]:
+        """A context for commands that change the player's state.
+        Yields whether the command may be executed.
+        :param important: If True, wait until all preceding accesses are finished.
+        If not, yield False after a timeout."""
+        timeout: Optional[float] = None if important else self.TIMEOUT
+        start = time.time()
+        token = object()
+        with self.condition:
+            self.waiting_writers.append(token)
+            acquired = self.condition.wait_for(
+                lambda: not self.writing
+                and self.readers == 0
+                and self.waiting_writers[0] is token,
+                timeout,
+            )
+            self.waiting_writers.remove(token)
+            if acquired:
+                self.writing = True
+            else:
+                # the next write or the blocked reads might be able to continue now
+                self.condition.notify_all()
+            self._record("write", acquired, time.time() - start)
+        if not acquired:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+    def get_statistics(self) -> Dict[str, Dict[str, float]]:
+        """Returns how often the player was accessed, how often accesses were dropped
+        and the average and maximum time spent waiting for access in milliseconds."""
+        with self.condition:
+            result = {}
+            for kind, statistics in self.statistics.items():
+                total = statistics["acquired"] + statistics["dropped"]
+                result[kind] = {
+                    "acquired": statistics["acquired"],
+                    "dropped": statistics["dropped"],
+                    "averageWait": round(
+                        1000 * statistics["total_wait"] / total if total else 0, 3
+                    ),
+                    "maxWait": round(1000 * statistics["max_wait"], 3),
+                }
+            return result
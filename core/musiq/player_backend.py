@@ -0,0 +1,91 @@
+"""This module contains the base class for all player backends."""
+
+from __future__ import annotations
+
+from typing import ContextManager, Optional
+
+from core.musiq.player_access import PlayerAccess
+from core.musiq.player_status import PlayerStatus
+
+
+class PlayerBackend:
+    """The base class for all players that songs are played with.
+    Provides abstract function declarations.
+    Each backend has a tracklist: the current track, followed by preloaded tracks.
+    Tracks in the tracklist are identified by their tracklist id (tlid).
+    Every command needs to be issued inside the backend's command context:
+    with backend.command() as allowed:
+        if allowed:
+            backend.pause()"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.access = PlayerAccess()
+        # updated from the events of the player
+        self.status = PlayerStatus()
+
+    def command(
+        self, important: bool = False, read_only: bool = False
+    ) -> ContextManager[bool]:
+        """A context that needs to be used around every command of this backend.
+        :param important: If True, wait until all preceding commands are finished.
+        If not, return 'False' after a timeout.
+        :param read_only: If True, the enclosed commands only query the player's state
+        and can run concurrently with other queries."""
+        if read_only:
+            return self.access.read(important=important)
+        return self.access.write(important=important)
+
+    def handles(self, uri: str) -> bool:
+        """Returns whether this backend is able to play the given uri."""
+        raise NotImplementedError()
+
+    def reset(self) -> None:
+        """Stops playback and clears the tracklist."""
+        raise NotImplementedError()
+
+    def play_song(self, uri: str, position: Optional[int] = None) -> Optional[int]:
+        """Replaces the tracklist with the given uri and starts playing it.
+        :param position: If given, playback starts at this position in milliseconds.
+        Returns the tracklist id of the started track."""
+        raise NotImplementedError()
+
+    def enqueue(self, uri: str) -> Optional[int]:
+        """Adds the given uri to the tracklist. When the current track is over,
+        the backend continues with it without a gap.
+        Returns the tracklist id of the added track, None if it could not be added."""
+        raise NotImplementedError()
+
+    def remove(self, tlid: int) -> bool:
+        """Removes the track with the given tracklist id from the tracklist.
+        Returns whether the track was removed."""
+        raise NotImplementedError()
+
+    def refresh_status(self) -> bool:
+        """Updates the status with the actual status of the player,
+        in case events were missed. Returns False if the player could not be reached."""
+        raise NotImplementedError()
+
+    def play(self) -> None:
+        """Resumes playback if it is paused."""
+        raise NotImplementedError()
+
+    def pause(self) -> None:
+        """Pauses playback if it is playing."""
+        raise NotImplementedError()
+
+    def seek(self, position: int) -> None:
+        """Jumps to the given position in the current track, in milliseconds."""
+        raise NotImplementedError()
+
+    def next(self) -> None:
+        """Ends the current track and continues with the next one in the tracklist, if any."""
+        raise NotImplementedError()
+
+    def get_volume(self) -> float:
+        """Returns the volume of the player as a float between 0 and 1."""
+        raise NotImplementedError()
+
+    def set_volume(self, volume: float) -> None:
+        """Sets the volume of the player to the given float between 0 and 1."""
+        raise NotImplementedError()
@@ -0,0 +1,141 @@
+"""This module keeps track of the playback status without querying the player."""
+
+from __future__ import annotations
+
+import time
+from threading import Condition, Lock
+from typing import Optional
+
+
+class PlayerStatus:
+    """Mirrors the playback state, the current track and the position of a player.
+    The status is updated from the player's events, reading it is a memory lookup.
+    While playing, the position is extrapolated from the time of the last event."""
+
+    def __init__(self) -> None:
+        # guards all attributes below
+        self.lock = Lock()
+        self.state = "stopped"
+        # the tracklist id of the current track, None if there is no current track
+        self.tlid: Optional[int] = None
+        # notified whenever the current track changes
+        self.track_changed = Condition(self.lock)
+        # the length of the current track in milliseconds, None if it is not known
+        self.track_length: Optional[int] = None
+        # the position in milliseconds at the given point in time
+        self.position = 0
+        self.timestamp = time.time()
+
+    def update(
+        self,
+        state: str,
+        tlid: Optional[int],
+        track_length: Optional[int],
+        position: Optional[int],
+    ) -> None:
+        """Sets the status to the given values, e.g. after querying the player directly."""
+        with self.lock:
+            self.state = state
+            self._set_tlid(tlid)
+            self.track_length = track_length
+            self._set_position(position or 0)
+
+    def _set_tlid(self, tlid: Optional[int]) -> None:
+        if tlid != self.tlid:
+            self.tlid = tlid
+            self.track_changed.notify_all()
+
+    def _set_position(self, position: int) -> None:
+        self.position = position
+        self.timestamp = time.time()
+
+    def _current_position(self) -> int:
+        position = self.position
+        if self.state == "playing":
+            position += round((time.time() - self.timestamp) * 1000)
+        if self.track_length:
+            position = min(position, self.track_length)
+        return position
+
+    def current_position(self) -> int:
+        """Returns the current position in the track in milliseconds."""
+        with self.lock:
+            return self._current_position()
+
+    def progress(self) -> float:
+        """Returns how far into the current track the playback is, in percent."""
+        with self.lock:
+            if not self.track_length:
+                return 0
+            return 100 * self._current_position() / self.track_length
+
+    def remaining(self) -> Optional[int]:
+        """Returns the time left in the current track in milliseconds,
+        or None if the length of the track is not known."""
+        with self.lock:
+            if not self.track_length:
+                return None
+            return self.track_length - self._current_position()
+
+    def paused(self) -> bool:
+        """Returns whether playback is currently paused or stopped."""
+        return self.state != "playing"
+
+    def wait_for_track_change(self, tlid: Optional[int], timeout: float) -> bool:
+        """Waits until the current track is not the track with the given tracklist id anymore,
+        at most :param timeout: seconds. Returns whether the track changed."""
+        with self.track_changed:
+            return self.track_changed.wait_for(lambda: self.tlid != tlid, timeout)
+
+    def started(self, tlid: int, track_length: Optional[int]) -> None:
+        """Called when the track with the given tracklist id started playing."""
+        with self.lock:
+            self.state = "playing"
+            self._set_tlid(tlid)
+            self.track_length = track_length
+            self._set_position(0)
+
+    def paused_at(self, position: int) -> None:
+        """Called when playback was paused at the given position."""
+        with self.lock:
+            self.state = "paused"
+            self._set_position(position)
+
+    def resumed_at(self, position: int) -> None:
+        """Called when playback was resumed at the given position."""
+        with self.lock:
+            self.state = "playing"
+            self._set_position(position)
+
+    def ended(self, tlid: int) -> None:
+        """Called when the track with the given tracklist id ended."""
+        with self.lock:
+            if tlid != self.tlid:
+                # a late event of a previous track
+                return
+            self._set_tlid(None)
+            self.track_length = None
+            self._set_position(0)
+
+    def seeked(self, position: int) -> None:
+        """Called when the position changed, e.g. after seeking."""
+        with self.lock:
+            self._set_position(position)
+
+    def length_changed(self, track_length: Optional[int]) -> None:
+        """Called when the length of the current track became known."""
+        with self.lock:
+            self.track_length = track_length
+
+    def state_changed(self, state: str) -> None:
+        """Called when the playback state changed to playing, paused or stopped."""
+        with self.lock:
+            if state == self.state:
+                return
+            # keep the position, but only extrapolate it while playing
+            self._set_position(self._current_position())
+            self.state = state
+            if self.state == "stopped":
+                self._set_tlid(None)
+                self.track_length = None
+                self.position = 0
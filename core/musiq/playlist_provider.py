@@ -1,8 +1,6 @@
 import logging
-import time
 from typing import Optional, Type, List
 
-from django.conf import settings
 from django.db import transaction
 from django.db.models.expressions import F
 
@@ -10,9 +8,9 @@ from core.models import (
     ArchivedPlaylist,
     PlaylistEntry,
     ArchivedPlaylistQuery,
-    RequestLog,
 )
 from core.musiq import song_utils as song_utils
+from core.musiq.log_writer import log_writer
 from core.musiq.music_provider import MusicProvider, ProviderError
 from core.musiq.song_provider import SongProvider
 
@@ -187,18 +185,18 @@ class PlaylistProvider(MusicProvider):
             )
 
         if self.musiq.base.settings.basic.logging_enabled and request_ip:
-            RequestLog.objects.create(playlist=archived_playlist, address=request_ip)
+            log_writer.log_request(request_ip, playlist=archived_playlist)
 
     def enqueue(self) -> None:
-        for index, external_url in enumerate(self.urls):
-            if index == self.musiq.base.settings.basic.max_playlist_items:
-                break
+        song_providers: List[SongProvider] = []
+        for external_url in self.urls[
+            : self.musiq.base.settings.basic.max_playlist_items
+        ]:
             # request every url in the playlist as their own url
             try:
-                song_provider = SongProvider.create(
-                    self.musiq, external_url=external_url
+                song_providers.append(
+                    SongProvider.create(self.musiq, external_url=external_url)
                 )
-                song_provider.request("", archive=False, manually_requested=False)
             except (ProviderError, NotImplementedError) as e:
                 logging.warning(
                     "Error while enqueuing url %s to playlist %s: %s",
@@ -207,9 +205,6 @@ class PlaylistProvider(MusicProvider):
                     self.id,
                 )
                 logging.exception(e)
-                continue
-
-            if settings.DEBUG:
-                # the sqlite database has problems if songs are pushed very fast
-                # while a new song is taken from the queue. Add a delay to mitigate.
-                time.sleep(1)
+        SongProvider.request_many(
+            self.musiq, song_providers, "", archive=False, manually_requested=False
+        )
@@ -1,17 +1,25 @@
 import logging
-from typing import Optional, Type, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Type, TYPE_CHECKING
 
-from django.db import transaction
+from django.conf import settings
+from django.db import connection, transaction
 from django.db.models.expressions import F
 from django.http.response import HttpResponse
 
-from core.models import ArchivedSong, QueuedSong, ArchivedQuery, RequestLog
+from core.models import ArchivedSong, QueuedSong, ArchivedQuery
 from core.musiq import song_utils as song_utils
-from core.musiq.music_provider import MusicProvider, WrongUrlError
+from core.musiq.log_writer import log_writer
+from core.musiq.music_provider import MusicProvider, ProviderError, WrongUrlError
 
 if TYPE_CHECKING:
+    from core.musiq.musiq import Musiq
     from core.musiq.song_utils import Metadata
 
+# Songs that are requested together, e.g. from a playlist, are checked and downloaded
+# by a few threads, instead of hitting the providers with all of them at once.
+request_executor = ThreadPoolExecutor(max_workers=settings.SONG_REQUEST_WORKERS)
+
 
 class SongProvider(MusicProvider):
     """The base class for all single song providers."""
@@ -153,22 +161,87 @@ class SongProvider(MusicProvider):
         logging.error("Can not extract id because neither key nor query are known")
         return None
 
-    def enqueue_placeholder(self, manually_requested) -> None:
-        metadata: Metadata = {
+    @staticmethod
+    def request_many(
+        musiq: "Musiq",
+        providers: Sequence["SongProvider"],
+        request_ip: str,
+        archive: bool = True,
+        manually_requested: bool = True,
+    ) -> None:
+        """Requests all given songs at once, keeping their order.
+        Songs that are not allowed are skipped right away.
+        The placeholders of the remaining songs are created in a single database operation.
+        Afterwards, the songs are checked and made available by a pool of background threads.
+        The placeholders of songs that turn out to be unavailable are removed again."""
+        allowed: List[SongProvider] = []
+        for provider in providers:
+            # this check is cheap, so it is done before a placeholder is shown
+            if not provider.check_new_music():
+                logging.warning(
+                    "Error while requesting %s: %s", provider.query, provider.error
+                )
+                continue
+            allowed.append(provider)
+        max_queue_length = musiq.base.settings.basic.max_queue_length
+        if max_queue_length > 0:
+            allowed = allowed[: max(0, max_queue_length - musiq.queue.song_count())]
+        if not allowed:
+            return
+
+        initial_votes = 1 if manually_requested else 0
+        queued_songs = musiq.queue.enqueue_many(
+            [provider.placeholder_metadata() for provider in allowed],
+            manually_requested,
+            votes=initial_votes,
+        )
+        for provider, queued_song in zip(allowed, queued_songs):
+            provider.queued_song = queued_song
+        musiq.update_state()
+
+        def enqueue(provider: SongProvider) -> None:
+            # one failing song should not prevent the remaining ones from being enqueued
+            try:
+                enqueue_function = provider.prepare_request(request_ip, archive=archive)
+                enqueue_function()
+            except ProviderError as e:
+                logging.warning("Error while requesting %s: %s", provider.query, e)
+                provider.remove_placeholder()
+                musiq.update_state()
+            except Exception:  # pylint: disable=broad-except
+                logging.exception("Error while enqueuing %s", provider.query)
+                provider.remove_placeholder()
+                musiq.update_state()
+            finally:
+                # the threads of the pool are reused, do not keep their connections open
+                connection.close()
+
+        for provider in allowed:
+            request_executor.submit(enqueue, provider)
+
+    def placeholder_metadata(self) -> "Metadata":
+        """Returns the metadata of the placeholder that represents this song in the queue."""
+        return {
             "internal_url": "",
             "external_url": "",
             "artist": "",
             "title": self.query or self.get_external_url(),
             "duration": -1,
         }
+
+    def enqueue_placeholder(self, manually_requested) -> None:
         initial_votes = 1 if manually_requested else 0
         self.queued_song = self.musiq.queue.enqueue(
-            metadata, manually_requested, votes=initial_votes
+            self.placeholder_metadata(), manually_requested, votes=initial_votes
         )
 
     def remove_placeholder(self) -> None:
         assert self.queued_song
-        self.queued_song.delete()
+        try:
+            self.musiq.queue.remove(self.queued_song.id)
+        except QueuedSong.DoesNotExist:
+            # the placeholder was already removed
+            pass
 
     def check_cached(self) -> bool:
         raise NotImplementedError()
@@ -187,6 +260,18 @@ class SongProvider(MusicProvider):
     def check_available(self) -> bool:
         raise NotImplementedError()
 
+    def check_new_music(self) -> bool:
+        if not self.musiq.base.settings.basic.new_music_only:
+            return True
+        try:
+            archived_song = ArchivedSong.objects.get(url=self.get_external_url())
+        except ArchivedSong.DoesNotExist:
+            return True
+        if archived_song.counter > 0:
+            self.error = "Only new music is allowed!"
+            return False
+        return True
+
     def make_available(self) -> bool:
         return True
 
@@ -215,35 +300,18 @@ class SongProvider(MusicProvider):
                 )
 
         if self.musiq.base.settings.basic.logging_enabled and request_ip:
-            RequestLog.objects.create(song=archived_song, address=request_ip)
+            log_writer.log_request(request_ip, song=archived_song)
 
     def enqueue(self) -> None:
         assert self.queued_song
-        if not self.musiq.queue.filter(id=self.queued_song.id).exists():
-            # this song was already deleted, do not enqueue
-            return
 
         from core.musiq.playback import Playback
 
         metadata = self.get_metadata()
 
-        self.queued_song.internal_url = metadata["internal_url"]
-        self.queued_song.external_url = metadata["external_url"]
-        self.queued_song.stream_url = metadata.get("stream_url", "")
-        self.queued_song.artist = metadata["artist"]
-        self.queued_song.title = metadata["title"]
-        self.queued_song.duration = metadata["duration"]
-        # make sure not to overwrite the index as it may have changed in the meantime
-        self.queued_song.save(
-            update_fields=[
-                "internal_url",
-                "external_url",
-                "stream_url",
-                "artist",
-                "title",
-                "duration",
-            ]
-        )
+        if not self.musiq.queue.confirm(self.queued_song.id, metadata):
+            # this song was already deleted, do not enqueue
+            return
 
         self.musiq.update_state()
         Playback.queue_semaphore.release()
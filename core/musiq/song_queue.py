@@ -1,44 +1,264 @@
-"""This module contains manages the song queue in the database."""
+"""This module contains manages the song queue in memory and in the database."""
 
 from __future__ import annotations
 
+import atexit
+import logging
 import random
-from typing import Optional, Tuple, TYPE_CHECKING
+import time
+from bisect import bisect_left, insort
+from functools import wraps
+from threading import Lock, RLock
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+    TypeVar,
+    cast,
+)
 
+from django.conf import settings
+from django.db import connection
 from django.db import models
 from django.db import transaction
-from django.db.models import F, QuerySet
+from django.forms.models import model_to_dict
 
 import core.models
+import core.musiq.song_utils as song_utils
+from core import util
+from core.util import background_thread
 
 if TYPE_CHECKING:
     from core.models import QueuedSong
     from core.musiq.song_utils import Metadata
 
+# Songs are spread out over the ordering key (the index column),
+# so a song can be moved or inserted by only updating the song itself.
+INDEX_GAP = 1 << 10
+# the range of the integer column that stores the index
+MIN_INDEX = -(1 << 31)
+MAX_INDEX = (1 << 31) - 1
+
+T = TypeVar("T", bound=Callable[..., Any])  # pylint: disable=invalid-name
+
+
+def queue_operation(func: T) -> T:
+    """A decorator for all methods that access the queue.
+    The method is executed while holding the queue lock.
+    Afterwards, changes are written to the database,
+    unless they are collected and written in the background.
+    The database is written after the queue lock is released,
+    so a slow write does not block other operations on the queue."""
+
+    def _decorator(self: "SongQueue", *args, **kwargs) -> Any:
+        with self.lock:
+            if not self.loaded:
+                self._load()
+            result = func(self, *args, **kwargs)
+        if not settings.QUEUE_WRITE_BEHIND:
+            self.flush()
+        return result
+
+    return cast(T, wraps(func)(_decorator))
+
 
 class SongQueue(models.Manager):
     """This is the manager for the QueuedSong model.
-    Handles all operations on the queue."""
+    Handles all operations on the queue.
+    The queue is held in memory, so reading it never touches the database.
+    Every change is persisted to the database,
+    either directly or in batches in the background (see QUEUE_WRITE_BEHIND)."""
 
-    @transaction.atomic
-    def confirmed(self) -> QuerySet[QueuedSong]:
-        """Returns a QuerySet containing all confirmed songs.
-        Confirmed songs are not in the process of being made available."""
-        return self.exclude(internal_url="")
+    def __init__(self) -> None:
+        super().__init__()
+        # guards the queue in memory and the list of pending database writes
+        self.lock = RLock()
+        # serializes writes to the database. Always acquired before the queue lock.
+        self.write_lock = Lock()
+        self.loaded = False
+        self._songs: Dict[int, QueuedSong] = {}
+        # (index, id) of every song, sorted by their position in the queue
+        self._order: List[Tuple[int, int]] = []
+        # (-votes, index, id) of every song, sorted by their rank in the voting system
+        self._ranking: List[Tuple[int, int, int]] = []
+        # ids of all songs that are available for playback, in no particular order,
+        # so a random song can be picked without looking at the whole queue
+        self._confirmed_ids: List[int] = []
+        # the position of every id in _confirmed_ids
+        self._confirmed_positions: Dict[int, int] = {}
+        # fields of songs that were changed in memory but not in the database
+        self._dirty: Dict[int, Set[str]] = {}
+        # songs that were removed from memory but not from the database
+        self._deleted: Set[int] = set()
+        self._flushing = False
+        # the serialized form of songs as they are sent to clients.
+        # Entries are removed whenever a field of their song changes.
+        self._dicts: Dict[int, Dict[str, Any]] = {}
+        # the sum of the durations of all songs
+        self._total_duration = 0
 
-    @transaction.atomic
-    def delete_placeholders(self) -> None:
-        """Deletes all songs from the queue that are not confirmed."""
-        self.filter(internal_url="").delete()
+    def _load(self) -> None:
+        self._songs = {song.id: song for song in self.get_queryset()}
+        self._sort()
+        self._confirmed_ids = []
+        self._confirmed_positions = {}
+        for song in self._songs.values():
+            if song.internal_url:
+                self._add_confirmed(song)
+        self._dirty = {}
+        self._deleted = set()
+        self._dicts = {}
+        self._total_duration = sum(song.duration for song in self._songs.values())
+        self.loaded = True
 
-    @transaction.atomic
-    def enqueue(
-        self, metadata: "Metadata", manually_requested: bool, votes=0
+    def load(self) -> None:
+        """Writes pending changes and reloads the queue from the database.
+        Starts the background writer if changes are written in batches."""
+        with self.write_lock, self.lock:
+            if self.loaded:
+                self._write(*self._take_changes())
+            self._load()
+            if settings.QUEUE_WRITE_BEHIND and not self._flushing:
+                self._flushing = True
+                self._flush_periodically()
+                atexit.register(self.flush)
+
+    def flush(self) -> None:
+        """Writes all pending changes of the queue to the database."""
+        with self.write_lock:
+            with self.lock:
+                changes = self._take_changes()
+            self._write(*changes)
+
+    @background_thread
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(settings.QUEUE_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:  # pylint: disable=broad-except
+                # the writer thread is not restarted, keep it running
+                logging.exception("error while persisting the queue: %s", e)
+
+    def _take_changes(self) -> Tuple[List["QueuedSong"], Set[str], Set[int]]:
+        """Returns the changed songs, their changed fields and the removed songs
+        and clears the list of pending changes. Needs to be called with the queue lock."""
+        dirty, self._dirty = self._dirty, {}
+        deleted, self._deleted = self._deleted, set()
+        fields: Set[str] = set()
+        for changed in dirty.values():
+            fields |= changed
+        return [self._songs[key] for key in dirty], fields, deleted
+
+    def _write(
+        self, songs: List["QueuedSong"], fields: Set[str], deleted: Set[int]
+    ) -> None:
+        # Songs that are changed again while they are written are marked as dirty again.
+        # Their current values are written with the next flush.
+        if not songs and not deleted:
+            return
+        with transaction.atomic():
+            if deleted:
+                self.filter(id__in=deleted).delete()
+            if songs:
+                # one bulk update instead of one statement per song
+                self.bulk_update(songs, sorted(fields))
+
+    def _mark_dirty(self, song: "QueuedSong", *fields: str) -> None:
+        self._dirty.setdefault(song.id, set()).update(fields)
+        # serialized songs do not contain their index,
+        # so they stay valid when songs are moved
+        if any(field != "index" for field in fields):
+            self._dicts.pop(song.id, None)
+
+    def _get(self, key: int) -> "QueuedSong":
+        try:
+            return self._songs[key]
+        except KeyError:
+            raise core.models.QueuedSong.DoesNotExist(f"no queued song with id {key}")
+
+    def _position(self, song: "QueuedSong") -> int:
+        return bisect_left(self._order, (song.index, song.id))
+
+    @staticmethod
+    def _rank(song: "QueuedSong") -> Tuple[int, int, int]:
+        # more votes come first, equal votes are ordered by their position in the queue
+        return -song.votes, song.index, song.id
+
+    def _sort(self) -> None:
+        """Rebuilds the order and the ranking of all songs from scratch."""
+        songs = self._songs.values()
+        self._order = sorted((song.index, song.id) for song in songs)
+        self._ranking = sorted(self._rank(song) for song in songs)
+
+    def _first(self) -> Optional["QueuedSong"]:
+        if not self._order:
+            return None
+        return self._songs[self._order[0][1]]
+
+    def _last(self) -> Optional["QueuedSong"]:
+        if not self._order:
+            return None
+        return self._songs[self._order[-1][1]]
+
+    def _add(self, song: "QueuedSong") -> None:
+        self._songs[song.id] = song
+        self._total_duration += song.duration
+        insort(self._order, (song.index, song.id))
+        insort(self._ranking, self._rank(song))
+        if song.internal_url:
+            self._add_confirmed(song)
+
+    def _add_confirmed(self, song: "QueuedSong") -> None:
+        if song.id in self._confirmed_positions:
+            return
+        self._confirmed_positions[song.id] = len(self._confirmed_ids)
+        self._confirmed_ids.append(song.id)
+
+    def _remove_confirmed(self, song: "QueuedSong") -> None:
+        position = self._confirmed_positions.pop(song.id, None)
+        if position is None:
+            return
+        # move the last id into the gap instead of shifting all following ids
+        last = self._confirmed_ids.pop()
+        if last != song.id:
+            self._confirmed_ids[position] = last
+            self._confirmed_positions[last] = position
+
+    def _set_index(self, song: "QueuedSong", index: int) -> None:
+        del self._order[self._position(song)]
+        del self._ranking[bisect_left(self._ranking, self._rank(song))]
+        song.index = index
+        insort(self._order, (song.index, song.id))
+        insort(self._ranking, self._rank(song))
+        self._mark_dirty(song, "index")
+
+    def _set_votes(self, song: "QueuedSong", votes: int) -> None:
+        del self._ranking[bisect_left(self._ranking, self._rank(song))]
+        song.votes = votes
+        insort(self._ranking, self._rank(song))
+        self._mark_dirty(song, "votes")
+
+    def _delete(self, song: "QueuedSong") -> None:
+        del self._order[self._position(song)]
+        del self._ranking[bisect_left(self._ranking, self._rank(song))]
+        del self._songs[song.id]
+        self._total_duration -= song.duration
+        self._remove_confirmed(song)
+        self._dirty.pop(song.id, None)
+        self._dicts.pop(song.id, None)
+        self._deleted.add(song.id)
+
+    @staticmethod
+    def _new_song(
+        index: int, metadata: "Metadata", manually_requested: bool, votes: int
     ) -> QueuedSong:
-        """Creates a new song at the end of the queue and returns it."""
-        last = self.last()
-        index = 1 if last is None else last.index + 1
-        song = self.create(
+        return core.models.QueuedSong(
             index=index,
             votes=votes,
             manually_requested=manually_requested,
@@ -48,66 +268,304 @@ class SongQueue(models.Manager):
             title=metadata["title"],
             duration=metadata["duration"],
         )
+
+    def _rebalance(self) -> None:
+        """Spreads all songs evenly over the index range, keeping their order.
+        Only needed when there is no gap left between two songs
+        or when an index would leave the range of the column."""
+        for position, (_, key) in enumerate(self._order, start=1):
+            song = self._songs[key]
+            song.index = position * INDEX_GAP
+            self._mark_dirty(song, "index")
+        self._sort()
+
+    def _index_between(
+        self, prev: Optional["QueuedSong"], next_song: Optional["QueuedSong"]
+    ) -> int:
+        """Returns an index for a song that is placed between
+        :param prev: and :param next_song:. Either of them may be None,
+        meaning the song is placed at the head or the tail of the queue.
+        The queue is rebalanced if there is no room left at the requested position."""
+        if prev is None and next_song is None:
+            return INDEX_GAP
+
+        def candidate() -> Optional[int]:
+            if next_song is None:
+                assert prev
+                index = prev.index + INDEX_GAP
+            elif prev is None:
+                index = next_song.index - INDEX_GAP
+            else:
+                index = (prev.index + next_song.index) // 2
+                if index == prev.index:
+                    # there is no gap left between the two songs
+                    return None
+            if not MIN_INDEX <= index <= MAX_INDEX:
+                return None
+            return index
+
+        index = candidate()
+        if index is None:
+            self._rebalance()
+            index = candidate()
+            assert index is not None
+        return index
+
+    @queue_operation
+    def all_songs(
+        self, start: int = 0, stop: Optional[int] = None
+    ) -> List["QueuedSong"]:
+        """Returns all songs in the order of the queue.
+        If :param start: or :param stop: are given, only this slice of the queue is returned."""
+        return [self._songs[key] for _, key in self._order[start:stop]]
+
+    @queue_operation
+    def ranked_songs(
+        self, start: int = 0, stop: Optional[int] = None
+    ) -> List["QueuedSong"]:
+        """Returns all songs ordered by their votes.
+        Songs with equal votes are ordered by their position in the queue.
+        If :param start: or :param stop: are given, only this slice of the ranking is returned."""
+        return [self._songs[key] for _, _, key in self._ranking[start:stop]]
+
+    @queue_operation
+    def total_duration(self) -> int:
+        """Returns the duration of all songs in the queue in seconds."""
+        return self._total_duration
+
+    def _song_dict(self, key: int) -> Dict[str, Any]:
+        song_dict = self._dicts.get(key)
+        if song_dict is None:
+            # the index in the database is sparse, clients number the songs themselves
+            song_dict = util.camelize(
+                model_to_dict(self._songs[key], exclude=["index"])
+            )
+            song_dict["durationFormatted"] = song_utils.format_seconds(
+                song_dict["duration"]
+            )
+            self._dicts[key] = song_dict
+        return song_dict
+
+    @queue_operation
+    def song_dicts(
+        self, start: int, stop: Optional[int], ranked: bool
+    ) -> List[Dict[str, Any]]:
+        """Returns the given slice of the queue as it is sent to clients,
+        ordered by votes if :param ranked: is set (see ranked_songs).
+        Songs are only serialized again after they changed."""
+        if ranked:
+            keys = [key for _, _, key in self._ranking[start:stop]]
+        else:
+            keys = [key for _, key in self._order[start:stop]]
+        return [dict(self._song_dict(key)) for key in keys]
+
+    @queue_operation
+    def song_count(self) -> int:
+        """Returns the number of songs in the queue, including placeholders."""
+        return len(self._order)
+
+    @queue_operation
+    def delete_placeholders(self) -> None:
+        """Deletes all songs from the queue that are not confirmed.
+        Confirmed songs are not in the process of being made available."""
+        for song in list(self._songs.values()):
+            if not song.internal_url:
+                self._delete(song)
+
+    @queue_operation
+    def enqueue(
+        self, metadata: "Metadata", manually_requested: bool, votes=0
+    ) -> QueuedSong:
+        """Creates a new song at the end of the queue and returns it."""
+        song = self._new_song(
+            self._index_between(self._last(), None),
+            metadata,
+            manually_requested,
+            votes,
+        )
+        # new songs are always inserted right away, their id is handed to the client
+        song.save(force_insert=True)
+        self._add(song)
         return song
 
-    @transaction.atomic
-    def dequeue(self) -> Tuple[int, Optional["QueuedSong"]]:
-        """Removes the first completed song from the queue and returns its id and the object."""
-        song = self.confirmed().first()
+    @queue_operation
+    def enqueue_many(
+        self, metadatas: List["Metadata"], manually_requested: bool, votes=0
+    ) -> List[QueuedSong]:
+        """Creates new songs at the end of the queue, in the given order.
+        All songs are inserted into the database at once. Returns the new songs."""
+        if not metadatas:
+            return []
+        last = self._last()
+        start = last.index if last else 0
+        if start + len(metadatas) * INDEX_GAP > MAX_INDEX:
+            self._rebalance()
+            last = self._last()
+            start = last.index if last else 0
+        songs = [
+            self._new_song(
+                start + position * INDEX_GAP, metadata, manually_requested, votes
+            )
+            for position, metadata in enumerate(metadatas, start=1)
+        ]
+        with transaction.atomic():
+            if connection.features.can_return_ids_from_bulk_insert:
+                self.bulk_create(songs)
+            else:
+                # without returned ids (e.g. sqlite), the songs have to be saved one by one
+                for song in songs:
+                    song.save(force_insert=True)
+        for song in songs:
+            self._add(song)
+        return songs
+
+    @queue_operation
+    def confirm(self, key: int, metadata: "Metadata") -> bool:
+        """Replaces the placeholder data of the song specified by :param key:
+        with the given metadata, making it available for playback.
+        Returns False if the song was removed from the queue in the meantime."""
+        song = self._songs.get(key)
+        if song is None:
+            return False
+        song.internal_url = metadata["internal_url"]
+        song.external_url = metadata["external_url"]
+        song.stream_url = metadata.get("stream_url", "")
+        song.artist = metadata["artist"]
+        song.title = metadata["title"]
+        # the database stores whole seconds, keep the same value in memory
+        duration = int(metadata["duration"])
+        self._total_duration += duration - song.duration
+        song.duration = duration
+        self._mark_dirty(
+            song,
+            "internal_url",
+            "external_url",
+            "stream_url",
+            "artist",
+            "title",
+            "duration",
+        )
+        if song.internal_url:
+            self._add_confirmed(song)
+        return True
+
+    def _pop(self, song: Optional["QueuedSong"]) -> Tuple[int, Optional["QueuedSong"]]:
         if song is None:
             return -1, None
-        song_id = song.id
-        song.delete()
-        self.filter(index__gt=song.index).update(index=F("index") - 1)
-        return song_id, song
+        self._delete(song)
+        return song.id, song
+
+    def _next(self) -> Optional["QueuedSong"]:
+        for _, key in self._order:
+            song = self._songs[key]
+            if song.internal_url:
+                return song
+        return None
+
+    def _most_voted(self) -> Optional["QueuedSong"]:
+        for _, _, key in self._ranking:
+            song = self._songs[key]
+            if song.internal_url:
+                return song
+        return None
+
+    def _random(self) -> Optional["QueuedSong"]:
+        if not self._confirmed_ids:
+            return None
+        return self._songs[random.choice(self._confirmed_ids)]
+
+    @queue_operation
+    def dequeue(self) -> Tuple[int, Optional["QueuedSong"]]:
+        """Removes the first completed song from the queue and returns its id and the object."""
+        return self._pop(self._next())
+
+    @queue_operation
+    def dequeue_most_voted(self) -> Tuple[int, Optional["QueuedSong"]]:
+        """Removes the completed song with the most votes from the queue
+        and returns its id and the object. Ties are resolved by queue position."""
+        return self._pop(self._most_voted())
+
+    @queue_operation
+    def dequeue_random(self) -> Tuple[int, Optional["QueuedSong"]]:
+        """Removes a random completed song from the queue and returns its id and the object."""
+        return self._pop(self._random())
+
+    @queue_operation
+    def dequeue_key(self, key: int) -> Tuple[int, Optional["QueuedSong"]]:
+        """Removes the song specified by :param key: from the queue
+        and returns its id and the object, if it is still in the queue."""
+        return self._pop(self._songs.get(key))
+
+    @queue_operation
+    def peek(self) -> Optional["QueuedSong"]:
+        """Returns the song that dequeue would remove, without removing it."""
+        return self._next()
+
+    @queue_operation
+    def peek_most_voted(self) -> Optional["QueuedSong"]:
+        """Returns the song that dequeue_most_voted would remove, without removing it."""
+        return self._most_voted()
 
-    @transaction.atomic
+    @queue_operation
+    def peek_random(self) -> Optional["QueuedSong"]:
+        """Returns a song that dequeue_random could remove, without removing it."""
+        return self._random()
+
+    @queue_operation
     def prioritize(self, key: int) -> None:
         """Moves the song specified by :param key: to the front of the queue."""
-        to_prioritize = self.get(id=key)
-        first = self.first()
+        to_prioritize = self._get(key)
+        first = self._first()
         if to_prioritize == first:
             return
 
-        self.filter(index__lt=to_prioritize.index).update(index=F("index") + 1)
-        to_prioritize.index = 1
-        to_prioritize.save()
+        self._set_index(to_prioritize, self._index_between(None, first))
 
-    @transaction.atomic
+    @queue_operation
     def remove(self, key: int) -> "QueuedSong":
         """Removes the song specified by :param key: from the queue and returns it."""
-        to_remove = self.get(id=key)
-        to_remove.delete()
-        self.filter(index__gt=to_remove.index).update(index=F("index") - 1)
+        to_remove = self._get(key)
+        self._delete(to_remove)
         return to_remove
 
-    @transaction.atomic
+    @queue_operation
+    def remove_all(self) -> int:
+        """Removes every song from the queue and returns how many songs were removed."""
+        count = len(self._order)
+        self._songs = {}
+        self._order = []
+        self._ranking = []
+        self._confirmed_ids = []
+        self._confirmed_positions = {}
+        self._dirty = {}
+        self._deleted = set()
+        self._dicts = {}
+        self._total_duration = 0
+        # delete everything at once instead of listing every song
+        self.all().delete()
+        return count
+
+    @queue_operation
     def reorder(
         self, new_prev_id: Optional[int], element_id: int, new_next_id: Optional[int]
     ) -> None:
         """Moves the song specified by :param element_id:
         between the two songs :param new_prev_id: and :param new_next_id:."""
 
-        try:
-            new_prev = self.get(id=new_prev_id)
-        except core.models.QueuedSong.DoesNotExist:
-            new_prev = None
-        try:
-            to_reorder = self.get(id=element_id)
-        except core.models.QueuedSong.DoesNotExist:
+        new_prev = None if new_prev_id is None else self._songs.get(new_prev_id)
+        to_reorder = self._songs.get(element_id)
+        if to_reorder is None:
             raise ValueError("reordered song does not exist")
-        try:
-            new_next = self.get(id=new_next_id)
-        except core.models.QueuedSong.DoesNotExist:
-            new_next = None
+        new_next = None if new_next_id is None else self._songs.get(new_next_id)
 
-        first = self.first()
-        last = self.last()
+        first = self._first()
+        last = self._last()
         # check validity of request
         if new_prev is None and new_next is None:
             # to_reorder has to be the only element in the queue
             if first != to_reorder or last != to_reorder:
                 raise ValueError("reordered song is not the only one")
+            return
         if new_prev is None and new_next is not None:
             # new_next has to be the first element
             if new_next != first:
@@ -118,72 +576,49 @@ class SongQueue(models.Manager):
                 raise ValueError("given last is not tail of the queue")
         if new_prev is not None and new_next is not None:
             # new_prev and new_next have to be adjacent
-            if new_next.index != new_prev.index + 1:
+            if self._position(new_next) != self._position(new_prev) + 1:
                 raise ValueError("given pair of songs is not adjacent")
 
-        try:
-            old_prev = self.get(index=to_reorder.index - 1)
-        except core.models.QueuedSong.DoesNotExist:
-            old_prev = None
-        try:
-            old_next = self.get(index=to_reorder.index + 1)
-        except core.models.QueuedSong.DoesNotExist:
-            old_next = None
-
-        # update indices
-        moving_up = True
-        if new_prev is not None:
-            if new_prev.index > to_reorder.index:
-                moving_up = False
-        elif new_next is not None:
-            if new_next.index > to_reorder.index:
-                moving_up = False
-
-        to_update = self.all()
-        if moving_up:
-            if old_prev is not None:
-                to_update = to_update.filter(index__lte=old_prev.index)
-            new_index = 1
-            if new_next is not None:
-                new_index = new_next.index
-                to_update = to_update.filter(index__gte=new_next.index)
-            to_update.update(index=F("index") + 1)
-        else:
-            new_index = 1
-            if new_prev is not None:
-                new_index = new_prev.index
-                to_update = to_update.filter(index__lte=new_prev.index)
-            if old_next is not None:
-                to_update = to_update.filter(index__gte=old_next.index)
-            to_update.update(index=F("index") - 1)
-
-        to_reorder.index = new_index
-        to_reorder.save()
-
-    @transaction.atomic
+        self._set_index(to_reorder, self._index_between(new_prev, new_next))
+
+    @queue_operation
     def shuffle(self) -> None:
-        """Assigns a random index to every song in the queue."""
-        indices = list(range(1, self.count() + 1))
+        """Assigns a random index to every song in the queue.
+        Only the memory is changed while holding the lock,
+        the new indices are written in a single bulk update afterwards."""
+        songs = list(self._songs.values())
+        indices = [position * INDEX_GAP for position in range(1, len(songs) + 1)]
         random.shuffle(indices)
-        for song, index in zip(self.all(), indices):
+        for song, index in zip(songs, indices):
             song.index = index
-            song.save()
-
-    @transaction.atomic
-    def vote_up(self, key: int) -> None:
-        """Increase the vote-count of the song specified by :param key:."""
-        self.filter(id=key).update(votes=F("votes") + 1)
-
-    @transaction.atomic
-    def vote_down(self, key: int, threshold: int) -> Optional["QueuedSong"]:
-        """Decrease the vote-count of the song specified by :param key:
-        If the song is now below the threshold, remove and return it."""
-        self.filter(id=key).update(votes=F("votes") - 1)
-        try:
-            song = self.get(id=key)
-            if song.votes <= threshold:
-                song.delete()
-                return song
-        except core.models.QueuedSong.DoesNotExist:
-            pass
-        return None
+            self._mark_dirty(song, "index")
+        self._sort()
+
+    @queue_operation
+    def contains(self, key: int) -> bool:
+        """Returns whether the song specified by :param key: is in the queue."""
+        return key in self._songs
+
+    @queue_operation
+    def votes(self, key: int) -> Optional[int]:
+        """Returns the vote-count of the song specified by :param key:
+        or None if the song is not in the queue."""
+        song = self._songs.get(key)
+        if song is None:
+            return None
+        return song.votes
+
+    @queue_operation
+    def vote(self, votes: Dict[int, int], threshold: int) -> List["QueuedSong"]:
+        """Changes the vote-count of every song in :param votes: by the given amount.
+        Songs that lost votes and are now below the threshold are removed and returned."""
+        removed = []
+        for key, amount in votes.items():
+            song = self._songs.get(key)
+            if song is None:
+                continue
+            self._set_votes(song, song.votes + amount)
+            if amount < 0 and song.votes <= threshold:
+                self._delete(song)
+                removed.append(song)
+        return removed
@@ -146,18 +146,13 @@ class SoundcloudSongProvider(SongProvider, Soundcloud):
         return self._get_related_urls()[0]
 
     def request_radio(self, request_ip: str) -> HttpResponse:
-        urls = self._get_related_urls()
-
-        for external_url in urls:
-            self.musiq.do_request_music(
-                "",
-                external_url,
-                None,
-                False,
-                "soundcloud",
-                archive=False,
-                manually_requested=False,
-            )
+        providers = [
+            SoundcloudSongProvider(self.musiq, external_url, None)
+            for external_url in self._get_related_urls()
+        ]
+        SongProvider.request_many(
+            self.musiq, providers, "", archive=False, manually_requested=False
+        )
 
         return HttpResponse("queueing radio")
 
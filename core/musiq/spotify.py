@@ -200,17 +200,13 @@ class SpotifySongProvider(SongProvider, Spotify):
             },
         )
 
-        for track in result["tracks"]:
-            external_url = track["external_urls"]["spotify"]
-            self.musiq.do_request_music(
-                "",
-                external_url,
-                None,
-                False,
-                "spotify",
-                archive=False,
-                manually_requested=False,
-            )
+        providers = [
+            SpotifySongProvider(self.musiq, track["external_urls"]["spotify"], None)
+            for track in result["tracks"]
+        ]
+        SongProvider.request_many(
+            self.musiq, providers, "", archive=False, manually_requested=False
+        )
 
         return HttpResponse("queueing radio")
 
@@ -0,0 +1,118 @@
+"""This module collects votes in memory and applies them in batches."""
+
+from __future__ import annotations
+
+import logging
+import time
+from threading import Lock
+from typing import Dict, TYPE_CHECKING
+
+from django.db.models import Case, F, IntegerField, Value, When
+
+import core.models as models
+from core.util import background_thread
+
+if TYPE_CHECKING:
+    from core.musiq.musiq import Musiq
+
+
+class Votes:
+    """Collects the votes for songs and applies them after a short delay.
+    This way, a burst of votes results in a single database write and state update.
+    Votes that would kick a song are applied immediately."""
+
+    # seconds between the first vote of a batch and applying the batch
+    FLUSH_INTERVAL = 0.2
+
+    def __init__(self, musiq: "Musiq") -> None:
+        self.musiq = musiq
+        # guards the pending votes
+        self.lock = Lock()
+        # the change in votes that was not yet applied, for every queue key
+        self.pending: Dict[int, int] = {}
+        self.flush_scheduled = False
+
+    def _threshold(self) -> int:
+        return -self.musiq.base.settings.basic.downvotes_to_kick
+
+    def vote(self, key: int, amount: int) -> None:
+        """Changes the vote-count of the song with the given queue key by :param amount:.
+        If this brings the song to the kick threshold, it is kicked right away."""
+        with self.lock:
+            pending = self.pending.get(key, 0) + amount
+            self.pending[key] = pending
+            schedule = not self.flush_scheduled
+            self.flush_scheduled = True
+
+        kick = False
+        if amount < 0:
+            # the song is either in the queue or it is the current song
+            votes = self.musiq.queue.votes(key)
+            if votes is None:
+                votes = (
+                    models.CurrentSong.objects.filter(queue_key=key)
+                    .values_list("votes", flat=True)
+                    .first()
+                )
+            kick = votes is not None and votes + pending <= self._threshold()
+
+        if kick:
+            self.flush()
+        elif schedule:
+            self._flush_delayed()
+
+    @background_thread
+    def _flush_delayed(self) -> None:
+        time.sleep(self.FLUSH_INTERVAL)
+        try:
+            self.flush()
+        except Exception as e:  # pylint: disable=broad-except
+            logging.exception("error while applying votes: %s", e)
+
+    def flush(self) -> None:
+        """Applies all pending votes to the current song and the queue
+        and kicks songs that reached the threshold."""
+        with self.lock:
+            pending = {key: amount for key, amount in self.pending.items() if amount}
+            self.pending = {}
+            self.flush_scheduled = False
+        if not pending:
+            return
+
+        # at most one of the keys belongs to the current song
+        updated = models.CurrentSong.objects.filter(queue_key__in=pending).update(
+            votes=F("votes")
+            + Case(
+                *[
+                    When(queue_key=key, then=Value(amount))
+                    for key, amount in pending.items()
+                ],
+                output_field=IntegerField(),
+            )
+        )
+        if updated:
+            try:
+                current_song = models.CurrentSong.objects.get(queue_key__in=pending)
+                if (
+                    pending[current_song.queue_key] < 0
+                    and current_song.votes <= self._threshold()
+                ):
+                    playback = self.musiq.playback
+                    with playback.backend.command() as allowed:
+                        if allowed:
+                            playback.backend.next()
+            except models.CurrentSong.DoesNotExist:
+                # the song ended in the meantime
+                pass
+
+        removed = self.musiq.queue.vote(pending, self._threshold())
+        for song in removed:
+            self.musiq.playback.queue_semaphore.acquire(blocking=False)
+            # if we removed a song by voting, and it was added by autoplay,
+            # we want it to be the new basis for autoplay
+            if not song.manually_requested:
+                self.musiq.playback.handle_autoplay(song.external_url or song.title)
+            else:
+                self.musiq.playback.handle_autoplay()
+
+        self.musiq.update_state()
@@ -27,9 +27,12 @@ class NetworkInfo(Stateful):
     def __init__(self, base: "Base"):
         self.base = base
 
-    def state_dict(self) -> Dict[str, Any]:
-        state_dict = self.base.state_dict()
-        return state_dict
+    def base_stateful(self) -> Stateful:
+        return self.base
+
+    def page_state_dict(self) -> Dict[str, Any]:
+        # this page only shows the base state
+        return {}
 
     def _qr_path(self, data) -> str:
         # from https://github.com/lincolnloop/python-qrcode/blob/master/qrcode/console_scripts.py
@@ -3,4 +3,7 @@
 from django.conf.urls import url
 from core import state_handler
 
-WEBSOCKET_URLPATTERNS = [url(r"^state/$", state_handler.StateConsumer)]
+WEBSOCKET_URLPATTERNS = [
+    url(r"^state/$", state_handler.StateConsumer),
+    url(r"^state/(?P<page>[a-z]+)/$", state_handler.StateConsumer),
+]
@@ -5,8 +5,10 @@ from __future__ import annotations
 
 import os
 import subprocess
+import time
 import yaml
 from functools import wraps
+from threading import Lock
 from typing import Callable, Dict, Any, TYPE_CHECKING, Optional, TypeVar, List
 
 from django.conf import settings
@@ -20,6 +22,7 @@ from django.urls import URLPattern
 
 from core.models import Setting
 from core.state_handler import Stateful
+from core.util import background_thread
 
 if TYPE_CHECKING:
     from core.base import Base
@@ -86,9 +89,94 @@ class Settings(Stateful):
         self.analysis = Analysis(self)
         self.system = System(self)
 
-    def state_dict(self) -> Dict[str, Any]:
-        state_dict = self.base.state_dict()
+        # guards the system status below
+        self.system_status_lock = Lock()
+        self._system_status: Optional[Dict[str, Any]] = None
+        self.system_status_time = 0.0
+        self.system_status_refreshing = False
 
+    @staticmethod
+    def _query_system_status() -> Dict[str, Any]:
+        status: Dict[str, Any] = {}
+        try:
+            with open(os.path.join(settings.BASE_DIR, "config/homewifi")) as f:
+                status["homewifiSsid"] = f.read()
+        except FileNotFoundError:
+            status["homewifiSsid"] = ""
+
+        try:
+            status["homewifiEnabled"] = (
+                subprocess.call(["/usr/local/sbin/raveberry/homewifi_enabled"]) != 0
+            )
+            status["eventsEnabled"] = (
+                subprocess.call(["/usr/local/sbin/raveberry/events_enabled"]) != 0
+            )
+            status["hotspotEnabled"] = (
+                subprocess.call(["/usr/local/sbin/raveberry/hotspot_enabled"]) != 0
+            )
+            status["wifiProtectionEnabled"] = (
+                subprocess.call(["/usr/local/sbin/raveberry/wifi_protection_enabled"])
+                != 0
+            )
+            status["tunnelingEnabled"] = (
+                subprocess.call(["sudo", "/usr/local/sbin/raveberry/tunneling_enabled"])
+                != 0
+            )
+            status["remoteEnabled"] = (
+                subprocess.call(["/usr/local/sbin/raveberry/remote_enabled"]) != 0
+            )
+        except FileNotFoundError:
+            status["systemInstall"] = False
+        else:
+            status["systemInstall"] = True
+            with open(os.path.join(settings.BASE_DIR, "config/raveberry.yaml")) as f:
+                config = yaml.safe_load(f)
+            status["hotspotConfigured"] = config["hotspot"]
+            status["remoteConfigured"] = config["remote_key"] is not None
+        return status
+
+    def refresh_system_status(self) -> None:
+        """Queries the status of the system and stores it.
+        Needs to be called after every change to the system configuration."""
+        status = self._query_system_status()
+        with self.system_status_lock:
+            self._system_status = status
+            self.system_status_time = time.time()
+
+    @background_thread
+    def _refresh_system_status_delayed(self) -> None:
+        try:
+            self.refresh_system_status()
+        finally:
+            with self.system_status_lock:
+                self.system_status_refreshing = False
+        self.update_state()
+
+    def system_status(self) -> Dict[str, Any]:
+        """Returns the last queried status of the system.
+        Querying it spawns several processes, so it is cached.
+        An outdated status is returned while it is refreshed in the background."""
+        with self.system_status_lock:
+            status = self._system_status
+            outdated = (
+                time.time() - self.system_status_time > settings.SYSTEM_STATUS_TTL
+            )
+            refresh = (
+                status is not None and outdated and not self.system_status_refreshing
+            )
+            if refresh:
+                self.system_status_refreshing = True
+        if status is None:
+            self.refresh_system_status()
+            return self.system_status()
+        if refresh:
+            self._refresh_system_status_delayed()
+        return status
+
+    def base_stateful(self) -> Stateful:
+        return self.base
+
+    def page_state_dict(self) -> Dict[str, Any]:
         settings_state = {}
         settings_state["votingSystem"] = self.basic.voting_system
         settings_state["newMusicOnly"] = self.basic.new_music_only
@@ -126,51 +214,16 @@ class Settings(Stateful):
 
         settings_state["output"] = self.sound.output
 
-        try:
-            with open(os.path.join(settings.BASE_DIR, "config/homewifi")) as f:
-                settings_state["homewifiSsid"] = f.read()
-        except FileNotFoundError:
-            settings_state["homewifiSsid"] = ""
-
         settings_state["scanProgress"] = self.library.scan_progress
 
-        try:
-            settings_state["homewifiEnabled"] = (
-                subprocess.call(["/usr/local/sbin/raveberry/homewifi_enabled"]) != 0
-            )
-            settings_state["eventsEnabled"] = (
-                subprocess.call(["/usr/local/sbin/raveberry/events_enabled"]) != 0
-            )
-            settings_state["hotspotEnabled"] = (
-                subprocess.call(["/usr/local/sbin/raveberry/hotspot_enabled"]) != 0
-            )
-            settings_state["wifiProtectionEnabled"] = (
-                subprocess.call(["/usr/local/sbin/raveberry/wifi_protection_enabled"])
-                != 0
-            )
-            settings_state["tunnelingEnabled"] = (
-                subprocess.call(["sudo", "/usr/local/sbin/raveberry/tunneling_enabled"])
-                != 0
-            )
-            settings_state["remoteEnabled"] = (
-                subprocess.call(["/usr/local/sbin/raveberry/remote_enabled"]) != 0
-            )
-        except FileNotFoundError:
-            settings_state["systemInstall"] = False
-        else:
-            settings_state["systemInstall"] = True
-            with open(os.path.join(settings.BASE_DIR, "config/raveberry.yaml")) as f:
-                config = yaml.safe_load(f)
-            settings_state["hotspotConfigured"] = config["hotspot"]
-            settings_state["remoteConfigured"] = config["remote_key"] is not None
+        settings_state.update(self.system_status())
 
         settings_state["youtubeConfigured"] = self.platforms.youtube_available
         settings_state["spotifyConfigured"] = self.platforms.spotify_available
         settings_state["soundcloudConfigured"] = self.platforms.soundcloud_available
         settings_state["jamendoConfigured"] = self.platforms.jamendo_available
 
-        state_dict["settings"] = settings_state
-        return state_dict
+        return {"settings": settings_state}
 
     def index(self, request: WSGIRequest) -> HttpResponse:
         """Renders the /settings page. Only admin is allowed to see this page."""
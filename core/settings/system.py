@@ -175,37 +175,44 @@ class System:
     def disable_events(self, _request: WSGIRequest) -> None:
         """Disable websocket support."""
         subprocess.call(["sudo", "/usr/local/sbin/raveberry/disable_events"])
+        self.settings.refresh_system_status()
 
     @Settings.option
     def enable_events(self, _request: WSGIRequest) -> None:
         """Enable websocket support."""
         subprocess.call(["sudo", "/usr/local/sbin/raveberry/enable_events"])
+        self.settings.refresh_system_status()
 
     @Settings.option
     def disable_hotspot(self, _request: WSGIRequest) -> None:
         """Disable the wifi created by Raveberry."""
         subprocess.call(["sudo", "/usr/local/sbin/raveberry/disable_hotspot"])
+        self.settings.refresh_system_status()
 
     @Settings.option
     def enable_hotspot(self, _request: WSGIRequest) -> None:
         """Enable the wifi created by Raveberry."""
         subprocess.call(["sudo", "/usr/local/sbin/raveberry/enable_hotspot"])
+        self.settings.refresh_system_status()
 
     @Settings.option
     def disable_wifi_protection(self, _request: WSGIRequest) -> None:
         """Disable password protection of the hotspot, making it public."""
         subprocess.call(["sudo", "/usr/local/sbin/raveberry/disable_wifi_protection"])
+        self.settings.refresh_system_status()
 
     @Settings.option
     def enable_wifi_protection(self, _request: WSGIRequest) -> None:
         """Enable password protection of the hotspot.
         The password was defined during setup."""
         subprocess.call(["sudo", "/usr/local/sbin/raveberry/enable_wifi_protection"])
+        self.settings.refresh_system_status()
 
     @Settings.option
     def disable_tunneling(self, _request: WSGIRequest) -> None:
         """Disable forwarding of packets to the other network (probably the internet)."""
         subprocess.call(["sudo", "/usr/local/sbin/raveberry/disable_tunneling"])
+        self.settings.refresh_system_status()
 
     @Settings.option
     def enable_tunneling(self, _request: WSGIRequest) -> None:
@@ -213,17 +220,20 @@ class System:
         Enables clients connected to the hotspot to browse the internet (if available)."""
         subprocess.call(["sudo", "/usr/local/sbin/raveberry/disable_tunneling"])
         subprocess.call(["sudo", "/usr/local/sbin/raveberry/enable_tunneling"])
+        self.settings.refresh_system_status()
 
     @Settings.option
     def disable_remote(self, _request: WSGIRequest) -> None:
         """Disables the connection to an external server."""
         subprocess.call(["sudo", "/usr/local/sbin/raveberry/disable_remote"])
+        self.settings.refresh_system_status()
 
     @Settings.option
     def enable_remote(self, _request: WSGIRequest) -> None:
         """Enables the connection to an external server.
         Allows this instance to be reachable from a public domain."""
         subprocess.call(["sudo", "/usr/local/sbin/raveberry/enable_remote"])
+        self.settings.refresh_system_status()
 
     @Settings.option
     def reboot_server(self, _request: WSGIRequest) -> None:
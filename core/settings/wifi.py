@@ -50,11 +50,13 @@ class Wifi:
     def disable_homewifi(self, _request: WSGIRequest) -> None:
         """Disable homewifi function."""
         subprocess.call(["sudo", "/usr/local/sbin/raveberry/disable_homewifi"])
+        self.settings.refresh_system_status()
 
     @Settings.option
     def enable_homewifi(self, _request: WSGIRequest) -> None:
         """Enable homewifi function."""
         subprocess.call(["sudo", "/usr/local/sbin/raveberry/enable_homewifi"])
+        self.settings.refresh_system_status()
 
     @Settings.option
     def stored_ssids(self, _request: WSGIRequest) -> JsonResponse:
@@ -74,4 +76,5 @@ class Wifi:
             return HttpResponseBadRequest("homewifi ssid was not supplied.")
         with open(os.path.join(settings.BASE_DIR, "config/homewifi"), "w+") as f:
             f.write(homewifi_ssid)
+        self.settings.refresh_system_status()
         return HttpResponse()
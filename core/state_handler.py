@@ -1,52 +1,453 @@
 """This module handles realtime communication via websockets."""
+import asyncio
 import json
-from typing import Dict, Any
+import logging
+import time
+from bisect import bisect_left
+from threading import Event, Lock
+from typing import Dict, Any, List, Optional, Set, Tuple
 
-from asgiref.sync import async_to_sync
-from channels.generic.websocket import WebsocketConsumer
+from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.layers import get_channel_layer
+from django.conf import settings
 from django.http import JsonResponse
 
+from core.user_manager import UserManager, scope_ip
+from core.util import background_thread
 
-def send_state_event(state: Dict[str, Any]) -> None:
-    """Sends the given dictionary as a state update to all connected clients."""
-    data = {"type": "state_update", "state": state}
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)("state", data)
+
+try:
+    # orjson is considerably faster than the standard library, use it if it is installed
+    import orjson
+
+    def encode(message: Dict[str, Any]) -> str:
+        """Serializes the given message to json."""
+        return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+except ModuleNotFoundError:
+
+    def encode(message: Dict[str, Any]) -> str:
+        """Serializes the given message to json."""
+        return json.dumps(message, separators=(",", ":"))
+
+
+def group_name(stream: str) -> str:
+    """Returns the name of the channel group that receives the given state stream."""
+    return "state-" + stream
+
+
+class Broadcaster:
+    """Sends messages to channel groups from the event loop that runs the consumers.
+    Callers hand over their message and return immediately,
+    they never wait for the channel layer. Messages are sent in the order they were given.
+
+    The channel layer is only ever used from the loop of the consumers.
+    This is required for the InMemoryChannelLayer, whose queues can only be used
+    from the loop that waits on them. The server runs all consumers in one loop."""
+
+    def __init__(self) -> None:
+        # guards the attributes below
+        self.lock = Lock()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: "Optional[asyncio.Queue[Tuple[str, Dict[str, Any]]]]" = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Sends all following messages from the given loop.
+        Needs to be called from within this loop, by every consumer when it connects."""
+        with self.lock:
+            if loop is self.loop:
+                return
+            self.loop = loop
+            self.queue = asyncio.Queue()
+            loop.create_task(self._send_messages(self.queue))
+
+    def send(self, group: str, data: Dict[str, Any]) -> None:
+        """Schedules sending :param data: to the given group and returns immediately."""
+        with self.lock:
+            loop, queue = self.loop, self.queue
+        if loop is None or queue is None:
+            # no client connected yet, so there is nobody to receive the message
+            return
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (group, data))
+        except RuntimeError:
+            # the loop was closed, the next consumer attaches a new one
+            pass
+
+    @staticmethod
+    async def _send_messages(
+        queue: "asyncio.Queue[Tuple[str, Dict[str, Any]]]",
+    ) -> None:
+        channel_layer = get_channel_layer()
+        while True:
+            group, data = await queue.get()
+            try:
+                await channel_layer.group_send(group, data)
+            except Exception as e:  # pylint: disable=broad-except
+                # the broadcaster is not restarted, keep it running
+                logging.exception("error while sending to group %s: %s", group, e)
+
+
+broadcaster = Broadcaster()
+
+
+def send_state_event(message: Dict[str, Any]) -> None:
+    """Sends the given state message to all clients that receive its stream.
+    The message is serialized once and forwarded by every consumer as is.
+    Returns without waiting for the message to be delivered."""
+    data = {"type": "state_update", "text": encode(message)}
+    broadcaster.send(group_name(message["stream"]), data)
+
+
+def _escape(key: str) -> str:
+    # json pointer escaping (RFC 6901)
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+def _keys(elements: List[Any]) -> Optional[List[Any]]:
+    # returns the ids of the given list elements,
+    # or None if they can not be identified by a unique id
+    keys = []
+    for element in elements:
+        if not isinstance(element, dict) or "id" not in element:
+            return None
+        keys.append(element["id"])
+    if len(set(keys)) != len(keys):
+        return None
+    return keys
+
+
+def _stable_keys(old_keys: List[Any], new_keys: List[Any]) -> Set[Any]:
+    # returns the largest set of elements that keep their relative order,
+    # the longest increasing subsequence of the old positions in the new list
+    old_positions = {key: position for position, key in enumerate(old_keys)}
+    positions = [old_positions[key] for key in new_keys if key in old_positions]
+    # tails[length] is the position of the last element of the best subsequence
+    # with length + 1 elements, predecessors allow to reconstruct it
+    tails: List[int] = []
+    predecessors: Dict[int, Optional[int]] = {}
+    for position in positions:
+        length = bisect_left(tails, position)
+        predecessors[position] = tails[length - 1] if length > 0 else None
+        if length == len(tails):
+            tails.append(position)
+        else:
+            tails[length] = position
+    stable = set()
+    current = tails[-1] if tails else None
+    while current is not None:
+        stable.add(old_keys[current])
+        current = predecessors[current]
+    return stable
+
+
+def _diff_keyed_lists(
+    old: List[Dict[str, Any]],
+    new: List[Dict[str, Any]],
+    old_keys: List[Any],
+    new_keys: List[Any],
+    path: str,
+) -> List[Dict[str, Any]]:
+    # Elements are matched by their id, so removing, adding or moving a song
+    # only results in operations for this song, not for every song after it.
+    patch: List[Dict[str, Any]] = []
+    new_key_set = set(new_keys)
+    for position in reversed(range(len(old_keys))):
+        if old_keys[position] not in new_key_set:
+            patch.append({"op": "remove", "path": f"{path}/{position}"})
+    # the keys of the list after every operation so far
+    current = [key for key in old_keys if key in new_key_set]
+    old_elements = dict(zip(old_keys, old))
+    stable = _stable_keys(current, new_keys)
+    # Every element that is not stable is placed right after its predecessor in the new list.
+    # Stable elements are never moved, they end up in the right order.
+    for position, key in enumerate(new_keys):
+        target = current.index(new_keys[position - 1]) + 1 if position > 0 else 0
+        if key not in old_elements:
+            patch.append(
+                {"op": "add", "path": f"{path}/{target}", "value": new[position]}
+            )
+            current.insert(target, key)
+            continue
+        if key not in stable:
+            source = current.index(key)
+            current.pop(source)
+            if source < target:
+                target -= 1
+            if source != target:
+                patch.append(
+                    {
+                        "op": "move",
+                        "from": f"{path}/{source}",
+                        "path": f"{path}/{target}",
+                    }
+                )
+            current.insert(target, key)
+        patch.extend(
+            diff_states(
+                old_elements[key], new[position], f"{path}/{current.index(key)}"
+            )
+        )
+    return patch
+
+
+def diff_states(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """Returns a list of JSON patch operations (RFC 6902) that transform :param old:
+    into :param new:. Only add, remove, replace and move operations are used.
+    Lists of objects with unique ids, like the song queue, are compared by id,
+    so removing, adding or moving an element results in a single operation.
+    Other lists are compared element-wise after stripping their common prefix and suffix,
+    so appending, removing or changing single elements results in small patches."""
+    if type(old) is not type(new):  # pylint: disable=unidiomatic-typecheck
+        return [{"op": "replace", "path": path, "value": new}]
+    if isinstance(old, dict):
+        patch = []
+        for key, value in new.items():
+            key_path = path + "/" + _escape(key)
+            if key not in old:
+                patch.append({"op": "add", "path": key_path, "value": value})
+            else:
+                patch.extend(diff_states(old[key], value, key_path))
+        for key in old:
+            if key not in new:
+                patch.append({"op": "remove", "path": path + "/" + _escape(key)})
+        return patch
+    if isinstance(old, list):
+        old_keys = _keys(old)
+        new_keys = _keys(new)
+        if old_keys is not None and new_keys is not None:
+            return _diff_keyed_lists(old, new, old_keys, new_keys, path)
+        start = 0
+        while start < min(len(old), len(new)) and old[start] == new[start]:
+            start += 1
+        old_end, new_end = len(old), len(new)
+        while (
+            old_end > start and new_end > start and old[old_end - 1] == new[new_end - 1]
+        ):
+            old_end -= 1
+            new_end -= 1
+        patch = []
+        # elements at the same position are changed in place
+        common = min(old_end, new_end) - start
+        for offset in range(common):
+            position = start + offset
+            patch.extend(
+                diff_states(old[position], new[position], f"{path}/{position}")
+            )
+        # surplus elements are removed or added
+        for _ in range(old_end - start - common):
+            patch.append({"op": "remove", "path": f"{path}/{start + common}"})
+        for position in range(start + common, new_end):
+            patch.append(
+                {"op": "add", "path": f"{path}/{position}", "value": new[position]}
+            )
+        return patch
+    if old != new:
+        return [{"op": "replace", "path": path, "value": new}]
+    return []
+
+
+class StateScheduler:
+    """Coalesces state updates. Every Stateful is sent at most once per
+    STATE_UPDATE_INTERVAL. Updates that are requested in the meantime are collected
+    and sent together at the end of the interval, using the state at that time.
+
+    The state of every Stateful is a versioned stream.
+    Clients receive a patch against the previous version of the stream.
+    If they missed a version, they request a snapshot of the current version."""
+
+    def __init__(self) -> None:
+        # guards the attributes below, up to the send lock
+        self.lock = Lock()
+        self.dirty: Set["Stateful"] = set()
+        self.last_sent: Dict["Stateful", float] = {}
+        self.wakeup = Event()
+        self.running = False
+        # makes sure versions are built and sent in order
+        self.send_lock = Lock()
+        # guards the attributes below. It is only held briefly,
+        # so snapshots never wait for a state to be built.
+        self.snapshot_lock = Lock()
+        # the last sent state and its version for every stream
+        self.states: Dict[str, Dict[str, Any]] = {}
+        self.versions: Dict[str, int] = {}
+
+    def snapshot(self, stream: str) -> Optional[Dict[str, Any]]:
+        """Returns a message containing the complete state of the given stream,
+        or None if nothing was sent on this stream yet."""
+        with self.snapshot_lock:
+            if stream not in self.states:
+                return None
+            return {
+                "stream": stream,
+                "version": self.versions[stream],
+                "state": self.states[stream],
+            }
+
+    def _send(self, stateful: "Stateful") -> None:
+        stream = type(stateful).__name__.lower()
+        with self.send_lock:
+            # the state is built inside the lock, so a newer state
+            # can never be sent with an older version
+            state = stateful.page_state_dict()
+            previous = self.states.get(stream)
+            message: Dict[str, Any] = {"stream": stream}
+            if previous is None:
+                message["state"] = state
+            else:
+                patch = diff_states(previous, state)
+                if not patch:
+                    return
+                message["patch"] = patch
+            version = self.versions.get(stream, 0) + 1
+            message["version"] = version
+            with self.snapshot_lock:
+                self.states[stream] = state
+                self.versions[stream] = version
+            send_state_event(message)
+
+    def schedule(self, stateful: "Stateful") -> None:
+        """Marks the state of the given Stateful as changed.
+        It is sent as soon as the interval since its last update has passed."""
+        with self.lock:
+            self.dirty.add(stateful)
+            if not self.running:
+                self.running = True
+                self._run()
+        self.wakeup.set()
+
+    def send_now(self, stateful: "Stateful") -> None:
+        """Sends the state of the given Stateful immediately."""
+        with self.lock:
+            self.dirty.discard(stateful)
+            self.last_sent[stateful] = time.time()
+        self._send(stateful)
+
+    @background_thread
+    def _run(self) -> None:
+        while True:
+            self.wakeup.wait()
+            due: List[Stateful] = []
+            wait: Optional[float] = None
+            with self.lock:
+                self.wakeup.clear()
+                now = time.time()
+                for stateful in list(self.dirty):
+                    remaining = (
+                        self.last_sent.get(stateful, 0)
+                        + settings.STATE_UPDATE_INTERVAL
+                        - now
+                    )
+                    if remaining <= 0:
+                        self.dirty.discard(stateful)
+                        self.last_sent[stateful] = now
+                        due.append(stateful)
+                    elif wait is None or remaining < wait:
+                        wait = remaining
+            for stateful in due:
+                try:
+                    self._send(stateful)
+                except Exception as e:  # pylint: disable=broad-except
+                    # the scheduler is not restarted, keep it running
+                    logging.exception("error while sending state: %s", e)
+            if wait is not None:
+                time.sleep(wait)
+                self.wakeup.set()
+
+
+scheduler = StateScheduler()
 
 
 class Stateful:
-    """A base class for all classes with a state that should be updated in real time."""
+    """A base class for all classes with a state that should be updated in real time.
+    Every page has its own state, which is only sent to the clients of that page.
+    The base state is shared by all pages and is sent to every client."""
 
-    def state_dict(self) -> Dict[str, Any]:
-        """Returns a dictionary containing all state of this class."""
+    def base_stateful(self) -> Optional["Stateful"]:
+        """Returns the Stateful holding the base state, None for the base itself."""
         raise NotImplementedError()
 
+    def page_state_dict(self) -> Dict[str, Any]:
+        """Returns a dictionary containing the state that is specific to this page."""
+        raise NotImplementedError()
+
+    def state_dict(self) -> Dict[str, Any]:
+        """Returns a dictionary containing all state of this page, including the base state."""
+        base = self.base_stateful()
+        assert base
+        state_dict = base.state_dict()
+        state_dict.update(self.page_state_dict())
+        return state_dict
+
     def get_state(self, _request) -> JsonResponse:
         """Returns the state of this class as a json dictionary for clients to use."""
         state = self.state_dict()
         return JsonResponse(state)
 
-    def update_state(self) -> None:
-        """Sends an update event to all connected clients."""
-        send_state_event(self.state_dict())
+    def update_state(self, immediate: bool = False) -> None:
+        """Sends an update event to all clients of this page.
+        Updates are coalesced and sent after a short delay,
+        unless :param immediate: is set, e.g. for latency-critical changes like song changes.
+        The base state is updated as well, but only sent if it changed."""
+        update = scheduler.send_now if immediate else scheduler.schedule
+        update(self)
+        base = self.base_stateful()
+        if base:
+            update(base)
+
 
+class StateConsumer(AsyncWebsocketConsumer):
+    """Handles connections with websocket clients.
+    Clients receive the base state and the state of the page they connected from."""
 
-class StateConsumer(WebsocketConsumer):
-    """Handles connections with websocket clients."""
+    async def connect(self) -> None:
+        broadcaster.attach(asyncio.get_running_loop())
+        # connected clients count as active users
+        UserManager.active_users.connect(scope_ip(self.scope))
+        self.streams = ["base"]
+        page = self.scope["url_route"]["kwargs"].get("page")
+        if page and page != "base":
+            self.streams.append(page)
+        for stream in self.streams:
+            await self.channel_layer.group_add(group_name(stream), self.channel_name)
+        await self.accept()
+        # Clients start with the current version of every stream they receive,
+        # so they can apply the next patch right away.
+        # Messages that were sent in the meantime have an older version and are ignored.
+        for stream in self.streams:
+            await self._send_snapshot(stream)
 
-    def connect(self) -> None:
-        async_to_sync(self.channel_layer.group_add)("state", self.channel_name)
-        self.accept()
+    async def disconnect(self, code: int) -> None:
+        UserManager.active_users.disconnect(scope_ip(self.scope))
+        for stream in self.streams:
+            await self.channel_layer.group_discard(
+                group_name(stream), self.channel_name
+            )
 
-    def disconnect(self, code: int) -> None:
-        async_to_sync(self.channel_layer.group_discard)("state", self.channel_name)
+    async def _send_snapshot(self, stream: str) -> None:
+        snapshot = scheduler.snapshot(stream)
+        if snapshot is not None:
+            await self.send(text_data=encode(snapshot))
 
-    def receive(self, text_data: str = None, bytes_data: bytes = None) -> None:
-        pass
+    async def receive(self, text_data: str = None, bytes_data: bytes = None) -> None:
+        # clients request a snapshot when they missed a version of a state stream
+        if text_data is None:
+            return
+        try:
+            request = json.loads(text_data)
+            stream = request["stream"]
+        except (ValueError, TypeError, KeyError):
+            return
+        if request.get("type") != "snapshot":
+            return
+        # only serve the streams this client receives
+        if stream not in self.streams:
+            return
+        await self._send_snapshot(stream)
 
     # Receive message from room group
-    def state_update(self, event: Dict[str, Any]):
+    async def state_update(self, event: Dict[str, Any]) -> None:
         """Receives a message from the room group and sends it back to the websocket."""
         # Send message to WebSocket
-        self.send(text_data=json.dumps(event["state"]))
+        await self.send(text_data=event["text"])
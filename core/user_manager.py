@@ -1,17 +1,85 @@
 """This module manages and counts user accesses."""
-from datetime import datetime
+import time
+from collections import OrderedDict
+from threading import Lock
 from typing import Any, Callable, Dict, TYPE_CHECKING
 
 import ipware
 from django.contrib.auth.models import AbstractUser
 from django.core.handlers.wsgi import WSGIRequest
-from django.utils import timezone
 
 
 if TYPE_CHECKING:
     from core.base import Base
 
 
+class ActiveUsers:
+    """Keeps track of the users that were active recently, identified by their ip.
+    Users are ordered by their last activity, so recording an activity takes constant time
+    and expired users are removed from the front without looking at the others.
+    Users with an open websocket connection count as active until they disconnect."""
+
+    # users are not counted anymore after this many seconds without any request
+    INACTIVITY_PERIOD = 600
+
+    def __init__(self) -> None:
+        # guards the attributes below
+        self.lock = Lock()
+        # the time of the last activity of every user, least recent first
+        self.last_seen: "OrderedDict[str, float]" = OrderedDict()
+        # the number of open websocket connections of every connected user
+        self.connections: Dict[str, int] = {}
+
+    def _touch(self, ip: str) -> None:
+        self.last_seen[ip] = time.time()
+        self.last_seen.move_to_end(ip)
+
+    def touch(self, ip: str) -> None:
+        """Records an activity of the given user."""
+        with self.lock:
+            self._touch(ip)
+
+    def connect(self, ip: str) -> None:
+        """Records that the given user opened a websocket connection."""
+        with self.lock:
+            self.connections[ip] = self.connections.get(ip, 0) + 1
+            self._touch(ip)
+
+    def disconnect(self, ip: str) -> None:
+        """Records that the given user closed a websocket connection."""
+        with self.lock:
+            remaining = self.connections.get(ip, 0) - 1
+            if remaining > 0:
+                self.connections[ip] = remaining
+            else:
+                self.connections.pop(ip, None)
+            self._touch(ip)
+
+    def _expire(self) -> None:
+        now = time.time()
+        while self.last_seen:
+            ip, last_seen = next(iter(self.last_seen.items()))
+            if now - last_seen < self.INACTIVITY_PERIOD:
+                break
+            if ip in self.connections:
+                # connected users are still active, move them to the back
+                self.last_seen[ip] = now
+                self.last_seen.move_to_end(ip)
+            else:
+                del self.last_seen[ip]
+
+    def expire(self) -> None:
+        """Removes all users that were inactive for too long."""
+        with self.lock:
+            self._expire()
+
+    def count(self) -> int:
+        """Returns the number of currently active users."""
+        with self.lock:
+            self._expire()
+            return len(self.last_seen)
+
+
 class UserManager:
     """This class counts active users and handles permissions."""
 
@@ -24,38 +92,37 @@ class UserManager:
         """Determines whether the given user is the admin."""
         return user.is_superuser
 
-    # This dictionary needs to be static so the middleware can access it.
-    last_requests: Dict[str, datetime] = {}
+    # This object needs to be static so the middleware and the websocket consumer can access it.
+    active_users = ActiveUsers()
 
     def __init__(self, base: "Base") -> None:
         self.base = base
 
-        # kick users after some time without any request
-        self.inactivity_period = 600
-        self.last_user_count_update = timezone.now()
-        self.update_user_count()
-
     def update_user_count(self) -> None:
-        """Go through all recent requests and delete those that were too long ago."""
-        now = timezone.now()
-        for key, value in list(UserManager.last_requests.items()):
-            if (now - value).seconds >= self.inactivity_period:
-                del UserManager.last_requests[key]
-        self.last_user_count_update = now
+        """Delete all users whose last request was too long ago."""
+        UserManager.active_users.expire()
 
     def get_count(self) -> int:
-        """Returns the number of currently active users.
-        Updates this number after an intervals since the last update."""
-        if (timezone.now() - self.last_user_count_update).seconds >= 60:
-            self.update_user_count()
-        return len(UserManager.last_requests)
+        """Returns the number of currently active users."""
+        return UserManager.active_users.count()
 
     def partymode_enabled(self) -> bool:
         """Determines whether partymode is enabled,
         based on the number of currently active users."""
-        return (
-            len(UserManager.last_requests) >= self.base.settings.basic.people_to_party
-        )
+        return self.get_count() >= self.base.settings.basic.people_to_party
+
+
+def scope_ip(scope: Dict[str, Any]) -> str:
+    """Returns the ip of the client of the given websocket connection.
+    Behind a reverse proxy, the ip is taken from the headers set by the proxy."""
+    headers = dict(scope.get("headers", []))
+    for header in (b"x-forwarded-for", b"x-real-ip"):
+        if header in headers:
+            return headers[header].decode().split(",")[0].strip()
+    client = scope.get("client")
+    if client:
+        return client[0]
+    return ""
 
 
 class SimpleMiddleware:
@@ -72,7 +139,7 @@ class SimpleMiddleware:
         request_ip, _ = ipware.get_client_ip(request)
         if request_ip is None:
             request_ip = ""
-        UserManager.last_requests[request_ip] = timezone.now()
+        UserManager.active_users.touch(request_ip)
 
         response = self.get_response(request)
 
@@ -0,0 +1,79 @@
+"""This module counts the visitors of the site in memory and persists them in batches."""
+
+from __future__ import annotations
+
+import logging
+import time
+from threading import Lock
+from typing import Optional, TYPE_CHECKING
+
+from django.db import transaction
+from django.db.models import F
+
+import core.models as models
+from core.util import background_thread
+
+if TYPE_CHECKING:
+    from core.base import Base
+
+
+class Visitors:
+    """Counts the visitors of the site. The counter is kept in memory,
+    visits are written to the database and broadcast a few seconds after they happened.
+    This way, a burst of page loads results in a single database write and state update."""
+
+    # seconds between the first visit of a batch and persisting the batch
+    FLUSH_INTERVAL = 5
+
+    def __init__(self, base: "Base") -> None:
+        self.base = base
+        # guards the attributes below
+        self.lock = Lock()
+        # the current value of the counter, None until it was loaded from the database
+        self.value: Optional[int] = None
+        # the visits that were not yet written to the database
+        self.pending = 0
+        self.flush_scheduled = False
+
+    def _load(self) -> int:
+        if self.value is None:
+            self.value = models.Counter.objects.get_or_create(
+                id=1, defaults={"value": 0}
+            )[0].value
+        return self.value
+
+    def get_count(self) -> int:
+        """Returns the number of visitors, including those that were not yet persisted."""
+        with self.lock:
+            return self._load()
+
+    def increment(self) -> None:
+        """Counts a visit. The visit is persisted and broadcast after a short delay."""
+        with self.lock:
+            self.value = self._load() + 1
+            self.pending += 1
+            schedule = not self.flush_scheduled
+            self.flush_scheduled = True
+        if schedule:
+            self._flush_delayed()
+
+    @background_thread
+    def _flush_delayed(self) -> None:
+        time.sleep(self.FLUSH_INTERVAL)
+        try:
+            self.flush()
+        except Exception as e:  # pylint: disable=broad-except
+            logging.exception("error while persisting visitors: %s", e)
+
+    def flush(self) -> None:
+        """Writes all pending visits to the database and sends the new count to clients."""
+        with self.lock:
+            pending = self.pending
+            self.pending = 0
+            self.flush_scheduled = False
+        if not pending:
+            return
+        with transaction.atomic():
+            models.Counter.objects.get_or_create(id=1, defaults={"value": 0})
+            models.Counter.objects.filter(id=1).update(value=F("value") + pending)
+        self.base.update_state()
@@ -0,0 +1,37 @@
+import {applyPatch} from '@src/util';
+
+test('patches change nested values', () => {
+  const state = {musiq: {songQueue: [{id: 1, votes: 0}, {id: 2, votes: 0}]}};
+  applyPatch(state, [
+    {op: 'replace', path: '/musiq/songQueue/1/votes', value: 1},
+  ]);
+  expect(state.musiq.songQueue[1].votes).toBe(1);
+});
+
+test('patches add and remove list elements in order', () => {
+  const state = {songQueue: [1, 2, 3]};
+  applyPatch(state, [
+    {op: 'remove', path: '/songQueue/0'},
+    {op: 'add', path: '/songQueue/2', value: 4},
+    {op: 'add', path: '/songQueue/3', value: 5},
+  ]);
+  expect(state.songQueue).toEqual([2, 3, 4, 5]);
+});
+
+test('patches move list elements', () => {
+  const state = {songQueue: [{id: 1}, {id: 2}, {id: 3}]};
+  applyPatch(state, [
+    {op: 'move', from: '/songQueue/0', path: '/songQueue/2'},
+    {op: 'replace', path: '/songQueue/2/id', value: 4},
+  ]);
+  expect(state.songQueue).toEqual([{id: 2}, {id: 3}, {id: 4}]);
+});
+
+test('patches add and remove keys', () => {
+  const state = {'a': 1, 'b/c': 2};
+  applyPatch(state, [
+    {op: 'remove', path: '/b~1c'},
+    {op: 'add', path: '/d', value: {e: null}},
+  ]);
+  expect(state).toEqual({a: 1, d: {e: null}});
+});
@@ -203,7 +203,10 @@ export function registerSpecificState(f) {
  * @param {Object} newState the state that was received
  */
 export function updateState(newState) {
-  updateBaseState(newState);
+  // the base state is sent separately from the state of each page
+  if ('partymode' in newState) {
+    updateBaseState(newState);
+  }
 
   for (const specificState of specificStates) {
     specificState(newState);
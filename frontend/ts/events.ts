@@ -1,7 +1,9 @@
 import ReconnectingWebSocket from 'reconnecting-websocket';
 import {updateState, reconnect} from './base.js';
+import {applyPatch} from './util.js';
 
-let socketUrl = window.location.host + '/state/';
+// pages without their own state only receive the base state
+let socketUrl = window.location.host + (urls['stateSocket'] || '/state/');
 if (window.location.protocol == 'https:') {
   socketUrl = 'wss://' + socketUrl;
 } else {
@@ -10,13 +12,36 @@ if (window.location.protocol == 'https:') {
 const stateSocket = new ReconnectingWebSocket(socketUrl, [], {});
 let unloading = false;
 
+// the latest state and its version of every state stream
+// The server sends the current version of every stream after connecting.
+let streams = {};
+
 stateSocket.addEventListener('message', (e) => {
-  const newState = JSON.parse(e.data);
-  updateState(newState);
+  const message = JSON.parse(e.data);
+  const stream = streams[message.stream];
+  if (stream !== undefined && message.version <= stream.version) {
+    // this version was already received, e.g. with the snapshot after connecting
+    return;
+  }
+  if ('state' in message) {
+    streams[message.stream] = {version: message.version, state: message.state};
+  } else if (stream !== undefined && stream.version + 1 == message.version) {
+    applyPatch(stream.state, message.patch);
+    stream.version = message.version;
+  } else {
+    // a version was missed, the patch can not be applied
+    stateSocket.send(JSON.stringify({type: 'snapshot', stream: message.stream}));
+    return;
+  }
+  // pages keep references to the state they received, hand out a copy
+  updateState(JSON.parse(JSON.stringify(streams[message.stream].state)));
 });
 
 let firstConnect = true;
 stateSocket.addEventListener('open', (e) => {
+  // versions start again after a restart of the server,
+  // so versions received before reconnecting must not be compared with new ones
+  streams = {};
   if (!firstConnect) {
     reconnect();
     $('#disconnected-banner').slideUp('fast');
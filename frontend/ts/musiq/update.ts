@@ -5,6 +5,13 @@ import {syncAudioStream} from './audio';
 export let state = null;
 let animationInProgress = false;
 
+// the state only contains the first songs of the queue.
+// Songs after this window are loaded when the user wants to see them.
+const queuePageSize = 50;
+let windowLength = 0;
+let additionalSongs = 0;
+let additionalQueue = [];
+
 const downloadSvg = `
 <svg version="1.1" viewBox="0 0 100 100" xmlns="http://www.w3.org/2000/svg">
  <g>
@@ -162,13 +169,67 @@ export function updateState(newState) {
   </li>
   */
 
+  // keep showing the songs after the window until they are reloaded
+  windowLength = state.songQueue.length;
+  extendQueue(state, additionalQueue);
+  updateQueueMore();
+
   // don't start a new animation when an old one is still in progress
   // the running animation will end in the (then) current state
   applyQueueChange(oldState, state);
 
+  if (additionalSongs > 0) {
+    loadAdditionalSongs();
+  }
+
   syncAudioStream();
 }
 
+/** Appends the given songs to the queue of the state, skipping songs it already contains.
+ * @param {Object} musiqState the state whose queue is extended
+ * @param {Array} songs the songs that are appended
+ */
+function extendQueue(musiqState, songs) {
+  const ids = new Set(musiqState.songQueue.map((song) => song.id));
+  for (const song of songs) {
+    if (!ids.has(song.id)) {
+      musiqState.songQueue.push(song);
+    }
+  }
+}
+
+/** Shows how many songs of the queue are not shown. */
+function updateQueueMore() {
+  const hidden = state.queueLength - state.songQueue.length;
+  if (hidden > 0) {
+    $('#queue-more-count').text(hidden);
+    $('#queue-more').show();
+  } else {
+    $('#queue-more').hide();
+  }
+}
+
+/** Loads the songs after the window of the state and shows them. */
+function loadAdditionalSongs() {
+  const loadedState = state;
+  $.get(urls['musiq']['queue-page'], {
+    start: windowLength,
+    count: additionalSongs,
+  }).done(function(response) {
+    if (state !== loadedState) {
+      // the state changed in the meantime, a newer request will update the queue
+      return;
+    }
+    additionalQueue = response.songs;
+    state.songQueue = state.songQueue.slice(0, windowLength);
+    extendQueue(state, additionalQueue);
+    updateQueueMore();
+    if (!animationInProgress) {
+      rebuildSongQueue(state);
+    }
+  });
+}
+
 /** Inserts the displayname of a song into an element.
  * @param {HTMLElement} element the div the displayname should be inserted into
  * @param {Object} song the song the info is taken from
@@ -184,9 +245,10 @@ function insertDisplayName(element, song) {
 
 /** Create a queue entry from the given song.
  * @param {Object} song the song containing all information
+ * @param {number} position the position of the song in the queue, starting at 1
  * @return {Object} the created queue item
  */
-function createQueueItem(song) {
+function createQueueItem(song, position) {
   const li = $('<li/>')
       .addClass('list-group-item');
   const entryDiv = $('<div/>')
@@ -208,7 +270,7 @@ function createQueueItem(song) {
   if (VOTING_SYSTEM) {
     index.text(song.votes);
   } else {
-    index.text(song.index);
+    index.text(position);
   }
   index.appendTo(entryDiv);
   if (song.internalUrl) {
@@ -271,7 +333,7 @@ function rebuildSongQueue(newState) {
   animationInProgress = false;
   $('#song-queue').empty();
   $.each(newState.songQueue, function(index, song) {
-    const queueEntry = createQueueItem(song);
+    const queueEntry = createQueueItem(song, index + 1);
     queueEntry.appendTo($('#song-queue'));
   });
 }
@@ -299,7 +361,7 @@ function applyQueueChange(oldState, newState) {
     $.each(newState.songQueue, function(newIndex, song) {
       if (!newIndices.includes(newIndex)) {
         // song was not present in old indices -> new song
-        const queueEntry = createQueueItem(song);
+        const queueEntry = createQueueItem(song, newIndex + 1);
         queueEntry.css('opacity', '0');
 
         queueEntry.appendTo($('#song-queue'));
@@ -357,4 +419,9 @@ $(document).ready(() => {
     return;
   }
   registerSpecificState(updateState);
+
+  $('#queue-more').on('click tap', function() {
+    additionalSongs += queuePageSize;
+    loadAdditionalSongs();
+  });
 });
@@ -8,3 +8,52 @@ export function kebabize(str) {
         letter;
   }).join('');
 }
+
+/** Returns the parent of the value at the given JSON pointer and the last key.
+ * @param {Object} document the object containing the value
+ * @param {string} path the JSON pointer (RFC 6901) to the value
+ * @return {Array} the parent object and the key of the value in it */
+function resolvePointer(document, path) {
+  const keys = path.split('/').slice(1).map(
+      (key) => key.replace(/~1/g, '/').replace(/~0/g, '~'));
+  const last = keys.pop();
+  let target = document;
+  for (const key of keys) {
+    target = target[key];
+  }
+  return [target, last];
+}
+
+/** Applies a JSON patch (RFC 6902) to the given document.
+ * Only the add, remove, replace and move operations are supported.
+ * @param {Object} document the object that is modified in place
+ * @param {Array} patch the list of operations */
+export function applyPatch(document, patch) {
+  for (const operation of patch) {
+    let value = operation.value;
+    if (operation.op == 'move') {
+      const [source, from] = resolvePointer(document, operation.from);
+      if (Array.isArray(source)) {
+        value = source.splice(parseInt(from), 1)[0];
+      } else {
+        value = source[from];
+        delete source[from];
+      }
+    }
+    const [target, last] = resolvePointer(document, operation.path);
+    if (Array.isArray(target)) {
+      const index = parseInt(last);
+      if (operation.op == 'add' || operation.op == 'move') {
+        target.splice(index, 0, value);
+      } else if (operation.op == 'remove') {
+        target.splice(index, 1);
+      } else {
+        target[index] = value;
+      }
+    } else if (operation.op == 'remove') {
+      delete target[last];
+    } else {
+      target[last] = value;
+    }
+  }
+}
@@ -274,3 +274,38 @@ if TESTING:
     SONGS_CACHE_DIR = TEST_CACHE_DIR
 
 pathlib.Path(SONGS_CACHE_DIR).mkdir(parents=True, exist_ok=True)
+
+# The song queue is kept in memory and every change is written to the database immediately.
+# With write behind, changes are collected and written in batches every QUEUE_FLUSH_INTERVAL
+# seconds instead, at the risk of losing the most recent changes on a crash.
+QUEUE_WRITE_BEHIND = bool(os.environ.get("DJANGO_QUEUE_WRITE_BEHIND"))
+QUEUE_FLUSH_INTERVAL = 2
+
+# With lookahead, the next song is added to mopidy's tracklist shortly before the current one ends,
+# so mopidy continues with it without a gap. The queue is updated after mopidy started the song.
+PLAYBACK_LOOKAHEAD = bool(os.environ.get("DJANGO_PLAYBACK_LOOKAHEAD"))
+# seconds before the end of a song at which the next song is added to mopidy's tracklist
+PLAYBACK_LOOKAHEAD_TIME = 10
+
+# With GStreamer playback, local files are played inside the raveberry process with GStreamer
+# instead of mopidy. Mopidy is still used for all other songs, e.g. from Spotify or Soundcloud.
+# Requires the GStreamer python bindings (gi).
+GSTREAMER_PLAYBACK = bool(os.environ.get("DJANGO_GSTREAMER_PLAYBACK"))
+# the GStreamer element that outputs the audio, e.g. fakesink to play without sound
+GSTREAMER_SINK = os.environ.get("DJANGO_GSTREAMER_SINK", "autoaudiosink")
+
+# State updates to clients are coalesced, every page is sent at most once per interval (seconds).
+# Latency-critical updates like song changes are sent immediately.
+STATE_UPDATE_INTERVAL = 0.2
+
+# The state only contains the first songs of the queue, clients request more if needed.
+QUEUE_WINDOW_SIZE = 50
+# The maximum number of songs that can be requested at once.
+QUEUE_PAGE_MAX_SIZE = 500
+
+# The number of songs of a playlist that are checked and downloaded at the same time.
+SONG_REQUEST_WORKERS = 4
+
+# The status of the system configuration is queried by spawning processes.
+# It is cached and refreshed in the background after this many seconds.
+SYSTEM_STATUS_TTL = 60
@@ -0,0 +1,82 @@
+import os
+import time
+import unittest
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from tests import util
+
+try:
+    from core.musiq.gstreamer_backend import GStreamerBackend
+except (ModuleNotFoundError, ValueError):
+    GStreamerBackend = None
+
+
+@unittest.skipIf(GStreamerBackend is None, "GStreamer is not installed")
+@override_settings(GSTREAMER_SINK="fakesink")
+class GStreamerTests(SimpleTestCase):
+    def setUp(self):
+        if not util.download_test_library():
+            self.skipTest("could not download test library")
+        techno = os.path.join(settings.TEST_CACHE_DIR, "test_library", "Techno")
+        self.sk8board = "file://" + os.path.join(techno, "Sk8board.mp3")
+        self.techtalk = "file://" + os.path.join(techno, "TechTalk.mp3")
+        self.backend = GStreamerBackend()
+
+    def tearDown(self):
+        self.backend.reset()
+
+    def _poll(self, break_condition, timeout=2):
+        timeout *= 10
+        counter = 0
+        while counter < timeout:
+            if break_condition():
+                break
+            time.sleep(0.1)
+            counter += 1
+        else:
+            self.fail("poll timeout")
+
+    def test_play(self):
+        tlid = self.backend.play_song(self.sk8board)
+        self.assertEqual(self.backend.status.tlid, tlid)
+        self._poll(lambda: self.backend.status.track_length)
+        self.assertEqual(round(self.backend.status.track_length / 1000), 126)
+        self._poll(lambda: self.backend.status.current_position() > 500)
+
+        self.backend.pause()
+        self._poll(lambda: self.backend.status.state == "paused")
+        self.backend.play()
+        self._poll(lambda: self.backend.status.state == "playing")
+
+    def test_seek(self):
+        self.backend.play_song(self.sk8board, position=60000)
+        self._poll(lambda: self.backend.refresh_status())
+        self.assertGreaterEqual(self.backend.status.current_position(), 59000)
+
+        self.backend.seek(10000)
+        self._poll(lambda: self.backend.status.current_position() < 20000)
+
+    def test_next(self):
+        first = self.backend.play_song(self.sk8board)
+        second = self.backend.enqueue(self.techtalk)
+        self.backend.next()
+        self.assertEqual(self.backend.status.tlid, second)
+        self.assertNotEqual(first, second)
+
+        # without further tracks, playback stops
+        self.backend.next()
+        self.assertIsNone(self.backend.status.tlid)
+        self.assertTrue(self.backend.status.paused())
+
+    def test_gapless(self):
+        # start shortly before the end, the enqueued track should follow on its own
+        self.backend.play_song(self.sk8board, position=124000)
+        second = self.backend.enqueue(self.techtalk)
+        self._poll(lambda: self.backend.status.tlid == second, timeout=5)
+
+    def test_end(self):
+        tlid = self.backend.play_song(self.sk8board, position=124000)
+        self.assertTrue(self.backend.status.wait_for_track_change(tlid, timeout=5))
+        self.assertIsNone(self.backend.status.tlid)
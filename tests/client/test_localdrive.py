@@ -2,6 +2,8 @@ import json
 
 from django.urls import reverse
 
+from core.models import RequestLog
+from core.musiq.log_writer import log_writer
 from tests.music_test import MusicTest
 
 
@@ -53,6 +55,16 @@ class LocaldriveTests(MusicTest):
             "local_library/Hard Rock/LongLiveDeath.mp3",
         )
 
+    def test_playlist_logging(self):
+        self.client.post(reverse("set-logging-enabled"), {"value": "true"})
+        self._poll_state(
+            "settings-state", lambda state: state["settings"]["loggingEnabled"]
+        )
+        self._add_local_playlist()
+
+        log_writer.flush()
+        self.assertTrue(RequestLog.objects.filter(playlist__isnull=False).exists())
+
     def test_autoplay(self):
         suggestion = json.loads(
             self.client.get(
@@ -0,0 +1,141 @@
+from json.decoder import JSONDecodeError
+from types import SimpleNamespace
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+from mopidyapi.exceptions import MopidyError
+
+from core.musiq.mopidy_batch import MopidyBatch
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        if self.data is None:
+            raise JSONDecodeError("Expecting value", "", 0)
+        return self.data
+
+
+class FakeTransport:
+    """Records the requests sent to mopidy and answers them with the given results."""
+
+    def __init__(self, results):
+        self.results = results
+        self.requests = []
+
+    def post(self, url, json):
+        self.requests.append((url, json))
+        if self.results is None:
+            return FakeResponse(None)
+        # mopidy does not guarantee the order of the responses
+        return FakeResponse(
+            [
+                {"jsonrpc": "2.0", "id": call["id"], **self.results[call["method"]]}
+                for call in reversed(json)
+            ]
+        )
+
+
+class MopidyBatchTests(SimpleTestCase):
+    URL = "http://localhost:6680/mopidy/rpc"
+
+    def setUp(self):
+        self.batch = MopidyBatch(SimpleNamespace(http_url=self.URL))
+
+    def _send(self, results):
+        transport = FakeTransport(results)
+        with mock.patch("core.musiq.mopidy_batch.requests.post", transport.post):
+            return transport, self.batch.send()
+
+    def test_request(self):
+        self.batch.add("core.tracklist.clear")
+        self.batch.add("core.tracklist.add", uris=["local:track:song.mp3"])
+        self.batch.add("core.playback.get_time_position")
+        transport, results = self._send(
+            {
+                "core.tracklist.clear": {"result": None},
+                "core.tracklist.add": {
+                    "result": [
+                        {
+                            "__model__": "TlTrack",
+                            "tlid": 1,
+                            "track": {
+                                "__model__": "Track",
+                                "uri": "local:track:song.mp3",
+                            },
+                        }
+                    ]
+                },
+                "core.playback.get_time_position": {"result": 1000},
+            }
+        )
+
+        # all calls are sent in a single request, in the order they were added
+        self.assertEqual(
+            transport.requests,
+            [
+                (
+                    self.URL,
+                    [
+                        {"jsonrpc": "2.0", "id": 0, "method": "core.tracklist.clear"},
+                        {
+                            "jsonrpc": "2.0",
+                            "id": 1,
+                            "method": "core.tracklist.add",
+                            "params": {"uris": ["local:track:song.mp3"]},
+                        },
+                        {
+                            "jsonrpc": "2.0",
+                            "id": 2,
+                            "method": "core.playback.get_time_position",
+                        },
+                    ],
+                )
+            ],
+        )
+
+        # results are matched to their calls and deserialized
+        clear_result, (tl_track,), position = results
+        self.assertIsNone(clear_result)
+        self.assertEqual(tl_track.tlid, 1)
+        self.assertEqual(tl_track.track.uri, "local:track:song.mp3")
+        self.assertEqual(position, 1000)
+
+        # the batch can be reused
+        self.batch.add("core.playback.play")
+        transport, results = self._send({"core.playback.play": {"result": None}})
+        self.assertEqual(
+            transport.requests[0][1],
+            [{"jsonrpc": "2.0", "id": 0, "method": "core.playback.play"}],
+        )
+        self.assertEqual(results, [None])
+
+    def test_empty(self):
+        transport, results = self._send({})
+        self.assertEqual(transport.requests, [])
+        self.assertEqual(results, [])
+
+    def test_error(self):
+        self.batch.add("core.playback.play")
+        self.batch.add("core.playback.seek", time_position=-1)
+        with self.assertRaisesRegex(MopidyError, "invalid position"):
+            self._send(
+                {
+                    "core.playback.play": {"result": None},
+                    "core.playback.seek": {
+                        "error": {
+                            "code": -32602,
+                            "message": "Invalid params",
+                            "data": {"message": "invalid position"},
+                        }
+                    },
+                }
+            )
+
+    def test_connection_error(self):
+        self.batch.add("core.playback.play")
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self._send(None)
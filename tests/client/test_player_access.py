@@ -0,0 +1,168 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.musiq.player_access import PlayerAccess
+
+
+class PlayerAccessTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(PlayerAccess, "TIMEOUT", 0.2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.access = PlayerAccess()
+        # the accesses in the order they were granted
+        self.log = []
+        self.threads = []
+
+    def tearDown(self):
+        for thread in self.threads:
+            thread.join(timeout=5)
+
+    def _poll(self, break_condition, timeout=1):
+        timeout *= 10
+        counter = 0
+        while counter < timeout:
+            if break_condition():
+                break
+            time.sleep(0.1)
+            counter += 1
+        else:
+            self.fail("poll timeout")
+
+    def _start(self, kind, name, release=None, important=True):
+        """Starts a thread that accesses the player and returns once it holds the access
+        or waits for it. The access is kept until the given event is set."""
+
+        def _access():
+            with getattr(self.access, kind)(important) as allowed:
+                self.log.append((name, allowed))
+                if release is not None:
+                    release.wait()
+
+        thread = threading.Thread(target=_access, daemon=True)
+        self.threads.append(thread)
+        with self.access.condition:
+            waiting = len(self.access.waiting_writers)
+        thread.start()
+        if kind == "write":
+            self._poll(
+                lambda: name in [entry[0] for entry in self.log]
+                or len(self.access.waiting_writers) > waiting
+            )
+        else:
+            # waiting reads are not visible, give them time to block
+            time.sleep(0.1)
+        return thread
+
+    def test_concurrent_reads(self):
+        release = threading.Event()
+        self._start("read", "first", release)
+        self._start("read", "second", release)
+        # reads do not block each other
+        self.assertEqual(self.log, [("first", True), ("second", True)])
+        self.assertEqual(self.access.readers, 2)
+        release.set()
+        self._poll(lambda: self.access.readers == 0)
+
+    def test_fifo_writes(self):
+        release = threading.Event()
+        self._start("write", "holder", release)
+        for name in ("first", "second", "third"):
+            self._start("write", name)
+        self.assertEqual(len(self.access.waiting_writers), 3)
+
+        # waiting writes are executed in the order they were issued
+        release.set()
+        self._poll(lambda: len(self.log) == 4)
+        self.assertEqual(
+            [name for name, _ in self.log], ["holder", "first", "second", "third"]
+        )
+
+    def test_writer_preference(self):
+        release_read = threading.Event()
+        release_write = threading.Event()
+        self._start("read", "reader", release_read)
+        self._start("write", "writer", release_write)
+        # a waiting write blocks new reads, even though a read is in progress
+        self._start("read", "late reader")
+        self.assertEqual(self.log, [("reader", True)])
+
+        release_read.set()
+        self._poll(lambda: len(self.log) == 2)
+        self.assertEqual(self.log[1], ("writer", True))
+        time.sleep(0.1)
+        self.assertEqual(len(self.log), 2)
+
+        release_write.set()
+        self._poll(lambda: len(self.log) == 3)
+        self.assertEqual(self.log[2], ("late reader", True))
+
+    def test_no_starvation(self):
+        stop = threading.Event()
+
+        def _read():
+            while not stop.is_set():
+                with self.access.read(important=True):
+                    time.sleep(0.01)
+
+        # the reads overlap, so there is never a moment without a reader
+        for _ in range(8):
+            thread = threading.Thread(target=_read, daemon=True)
+            self.threads.append(thread)
+            thread.start()
+        try:
+            time.sleep(0.1)
+            start = time.time()
+            with self.access.write() as allowed:
+                wait = time.time() - start
+                self.assertTrue(allowed)
+                self.assertEqual(self.access.readers, 0)
+            self.assertLess(wait, PlayerAccess.TIMEOUT)
+        finally:
+            stop.set()
+
+    def test_timeout(self):
+        release = threading.Event()
+        self._start("write", "holder", release)
+
+        # unimportant accesses give up after the timeout
+        with self.access.read() as allowed:
+            self.assertFalse(allowed)
+        with self.access.write() as allowed:
+            self.assertFalse(allowed)
+        # a dropped write does not block the following ones
+        self.assertEqual(len(self.access.waiting_writers), 0)
+
+        release.set()
+        with self.access.write() as allowed:
+            self.assertTrue(allowed)
+        with self.access.read() as allowed:
+            self.assertTrue(allowed)
+
+    def test_statistics(self):
+        release = threading.Event()
+        self._start("write", "holder", release)
+        with self.access.read():
+            pass
+        release.set()
+        with self.access.read():
+            pass
+
+        statistics = self.access.get_statistics()
+        self.assertEqual(statistics["read"]["acquired"], 1)
+        self.assertEqual(statistics["read"]["dropped"], 1)
+        self.assertEqual(statistics["write"]["acquired"], 1)
+        self.assertEqual(statistics["write"]["dropped"], 0)
+        # waiting times are given in milliseconds
+        timeout = PlayerAccess.TIMEOUT * 1000
+        self.assertGreaterEqual(statistics["read"]["maxWait"], timeout)
+        self.assertLess(statistics["read"]["maxWait"], timeout + 100)
+        self.assertAlmostEqual(
+            statistics["read"]["averageWait"],
+            self.access.statistics["read"]["total_wait"] * 1000 / 2,
+            places=2,
+        )
+        self.assertLess(statistics["write"]["averageWait"], 100)
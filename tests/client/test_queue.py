@@ -114,6 +114,32 @@ class QueueTests(MusicTest):
             == [key2, key1, key3]
         )
 
+    def test_indices(self):
+        state = json.loads(self.client.get(reverse("musiq-state")).content)
+        key = state["musiq"]["songQueue"][2]["id"]
+
+        # the internal ordering is not sent, clients number the songs themselves
+        self.client.post(reverse("prioritize"), {"key": str(key)})
+        state = self._poll_musiq_state(
+            lambda state: state["musiq"]["songQueue"][0]["id"] == key
+        )
+        for song in state["musiq"]["songQueue"]:
+            self.assertNotIn("index", song)
+
+    def test_queue_page(self):
+        state = json.loads(self.client.get(reverse("musiq-state")).content)
+        self.assertEqual(state["musiq"]["queueLength"], 3)
+
+        # pages continue the queue
+        page = json.loads(
+            self.client.get(reverse("queue-page"), {"start": 1, "count": 5}).content
+        )
+        self.assertEqual(page["queueLength"], 3)
+        self.assertEqual(
+            [song["id"] for song in page["songs"]],
+            [song["id"] for song in state["musiq"]["songQueue"][1:]],
+        )
+
     def test_remove_all(self):
         self.client.post(reverse("remove-all"))
         self._poll_musiq_state(lambda state: len(state["musiq"]["songQueue"]) == 0)
@@ -0,0 +1,63 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.test import RequestFactory, TransactionTestCase
+
+from core.settings.settings import Settings
+
+
+class SystemStatusTests(TransactionTestCase):
+    def setUp(self):
+        self.statuses = iter(range(100))
+        patchers = [
+            mock.patch.object(
+                Settings,
+                "_query_system_status",
+                side_effect=lambda: {"query": next(self.statuses)},
+            ),
+            mock.patch.object(Settings, "update_state"),
+            mock.patch("core.settings.system.subprocess.call"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.settings = Settings(mock.Mock())
+
+    def _poll(self, break_condition, timeout=1):
+        timeout *= 10
+        counter = 0
+        while counter < timeout:
+            if break_condition():
+                break
+            time.sleep(0.1)
+            counter += 1
+        else:
+            self.fail("poll timeout")
+
+    def test_cached(self):
+        # the first call queries the system, following ones use the cache
+        self.assertEqual(self.settings.system_status(), {"query": 0})
+        self.assertEqual(self.settings.system_status(), {"query": 0})
+        self.assertEqual(Settings._query_system_status.call_count, 1)
+
+    def test_outdated(self):
+        self.settings.system_status()
+        self.settings.system_status_time -= settings.SYSTEM_STATUS_TTL + 1
+
+        # the outdated status is returned while it is refreshed in the background
+        self.assertEqual(self.settings.system_status(), {"query": 0})
+        self._poll(lambda: self.settings.system_status() == {"query": 1})
+        self.assertEqual(Settings._query_system_status.call_count, 2)
+        self.settings.update_state.assert_called_once_with()
+
+    def test_action(self):
+        self.settings.system_status()
+
+        # changing the system configuration refreshes the status right away
+        request = RequestFactory().post("/settings/enable_events/")
+        request.user = mock.Mock()
+        response = self.settings.system.enable_events(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.settings.system_status(), {"query": 1})
+        self.assertEqual(Settings._query_system_status.call_count, 2)
@@ -0,0 +1,176 @@
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from core.models import QueuedSong
+from core.routing import WEBSOCKET_URLPATTERNS
+from core.state_handler import Stateful, diff_states, encode
+
+
+class StatePatchTests(TransactionTestCase):
+    def setUp(self):
+        self.queue = QueuedSong.objects
+        self.queue.load()
+        songs = self.queue.enqueue_many(
+            [
+                {
+                    "internal_url": f"local:track:{i}.mp3",
+                    "external_url": f"local_library/{i}.mp3",
+                    "artist": f"Artist {i}",
+                    "title": f"Title {i}",
+                    "duration": 180,
+                }
+                for i in range(settings.QUEUE_WINDOW_SIZE + 10)
+            ],
+            manually_requested=False,
+        )
+        self.keys = [song.id for song in songs]
+
+    def tearDown(self):
+        self.queue.remove_all()
+
+    def _state(self):
+        return {
+            "songQueue": self.queue.song_dicts(
+                0, settings.QUEUE_WINDOW_SIZE, ranked=False
+            )
+        }
+
+    def _assert_small_patch(self, old, new, operations):
+        patch = diff_states(old, new)
+        self.assertEqual(len(patch), operations)
+        # a song is only sent if it enters the window
+        self.assertLess(len(encode({"patch": patch})), len(encode(new)) / 10)
+
+    def test_dequeue(self):
+        old = self._state()
+        self.queue.dequeue()
+        # the first song is removed, the next one after the window is added
+        self._assert_small_patch(old, self._state(), 2)
+
+    def test_reorder(self):
+        old = self._state()
+        self.queue.reorder(self.keys[5], self.keys[0], self.keys[6])
+        new = self._state()
+        self.assertEqual(new["songQueue"][5]["id"], self.keys[0])
+        # the moved song is the only one that changes
+        self._assert_small_patch(old, new, 1)
+
+    def test_prioritize(self):
+        old = self._state()
+        self.queue.prioritize(self.keys[20])
+        self._assert_small_patch(old, self._state(), 1)
+
+
+class Counter(Stateful):
+    def __init__(self):
+        self.value = 0
+
+    def base_stateful(self):
+        return None
+
+    def page_state_dict(self):
+        return {"value": self.value}
+
+
+class StateSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.messages = []
+        patcher = mock.patch(
+            "core.state_handler.send_state_event", self.messages.append
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.counter = Counter()
+        # the first update is sent right away, following ones are coalesced
+        self.counter.update_state(immediate=True)
+        self.assertEqual(len(self.messages), 1)
+
+    def test_coalesce(self):
+        for _ in range(10):
+            self.counter.value += 1
+            self.counter.update_state()
+        self.assertEqual(len(self.messages), 1)
+
+        # the burst is sent once, at the end of the interval, with the latest state
+        time.sleep(settings.STATE_UPDATE_INTERVAL * 2)
+        self.assertEqual(len(self.messages), 2)
+        self.assertEqual(
+            self.messages[1]["patch"],
+            [{"op": "replace", "path": "/value", "value": 10}],
+        )
+
+    def test_immediate(self):
+        self.counter.value += 1
+        self.counter.update_state(immediate=True)
+        # immediate updates do not wait for the interval
+        self.assertEqual(len(self.messages), 2)
+        self.assertEqual(self.messages[1]["version"], self.messages[0]["version"] + 1)
+
+        # a pending update is not sent again after an immediate one
+        self.counter.value += 1
+        self.counter.update_state()
+        self.counter.update_state(immediate=True)
+        time.sleep(settings.STATE_UPDATE_INTERVAL * 2)
+        self.assertEqual(len(self.messages), 3)
+
+
+def _stateful(name):
+    # streams are named after the class of their Stateful
+    return type(name, (Counter,), {})()
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class StateConsumerTests(SimpleTestCase):
+    def setUp(self):
+        self.statefuls = [_stateful(name) for name in ("Base", "Musiq", "Lights")]
+        for stateful in self.statefuls:
+            stateful.update_state(immediate=True)
+
+    def test_streams(self):
+        async_to_sync(self._test_streams)()
+
+    async def _test_streams(self):
+        communicator = WebsocketCommunicator(
+            URLRouter(WEBSOCKET_URLPATTERNS), "/state/musiq/"
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        # the client starts with the current version of the base and its page
+        snapshots = [await communicator.receive_json_from() for _ in range(2)]
+        self.assertEqual(
+            sorted(snapshot["stream"] for snapshot in snapshots), ["base", "musiq"]
+        )
+        self.assertTrue(await communicator.receive_nothing())
+
+        # updates of other pages are not received
+        for stateful in self.statefuls:
+            stateful.value += 1
+            stateful.update_state(immediate=True)
+        updates = [await communicator.receive_json_from() for _ in range(2)]
+        self.assertEqual(
+            sorted(update["stream"] for update in updates), ["base", "musiq"]
+        )
+        for update in updates:
+            self.assertEqual(
+                update["patch"], [{"op": "replace", "path": "/value", "value": 1}]
+            )
+        self.assertTrue(await communicator.receive_nothing())
+
+        # snapshots are only served for the streams of the client
+        await communicator.send_json_to({"type": "snapshot", "stream": "lights"})
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.send_json_to({"type": "snapshot", "stream": "musiq"})
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual(snapshot["stream"], "musiq")
+        self.assertEqual(snapshot["state"], {"value": 1})
+
+        await communicator.disconnect()
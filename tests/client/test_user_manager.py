@@ -0,0 +1,57 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.user_manager import ActiveUsers
+
+
+class ActiveUsersTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("core.user_manager.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.users = ActiveUsers()
+
+    def test_order(self):
+        for ip in ("a", "b", "c"):
+            self.users.touch(ip)
+            self.now += 1
+        # an activity moves the user to the back
+        self.users.touch("a")
+        self.assertEqual(list(self.users.last_seen), ["b", "c", "a"])
+        self.assertEqual(self.users.count(), 3)
+
+    def test_expire(self):
+        for ip in ("a", "b", "c"):
+            self.users.touch(ip)
+            self.now += 10
+        self.users.touch("a")
+
+        # inactive users are removed from the front
+        self.now += ActiveUsers.INACTIVITY_PERIOD - 15
+        self.assertEqual(self.users.count(), 2)
+        self.assertEqual(list(self.users.last_seen), ["c", "a"])
+        self.now += 10
+        self.assertEqual(self.users.count(), 1)
+        self.now += ActiveUsers.INACTIVITY_PERIOD
+        self.assertEqual(self.users.count(), 0)
+
+    def test_connections(self):
+        self.users.connect("a")
+        self.users.connect("a")
+        self.users.touch("b")
+
+        # connected users do not expire
+        self.now += ActiveUsers.INACTIVITY_PERIOD
+        self.assertEqual(self.users.count(), 1)
+        self.assertEqual(list(self.users.last_seen), ["a"])
+
+        # users are only disconnected after their last connection was closed
+        self.users.disconnect("a")
+        self.now += ActiveUsers.INACTIVITY_PERIOD
+        self.assertEqual(self.users.count(), 1)
+        self.users.disconnect("a")
+        self.assertEqual(self.users.connections, {})
+        self.now += ActiveUsers.INACTIVITY_PERIOD
+        self.assertEqual(self.users.count(), 0)
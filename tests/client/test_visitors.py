@@ -0,0 +1,62 @@
+import time
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from core.models import Counter
+from core.visitors import Visitors
+
+
+class VisitorsTests(TransactionTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(Visitors, "FLUSH_INTERVAL", 0.5)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.base = mock.Mock()
+        self.visitors = Visitors(self.base)
+
+    def _persisted(self):
+        return Counter.objects.get_or_create(id=1, defaults={"value": 0})[0].value
+
+    def _poll(self, break_condition, timeout=1):
+        timeout *= 10
+        counter = 0
+        while counter < timeout:
+            if break_condition():
+                break
+            time.sleep(0.1)
+            counter += 1
+        else:
+            self.fail("poll timeout")
+
+    def test_flush(self):
+        for _ in range(5):
+            self.visitors.increment()
+        # visits are counted right away, but persisted later
+        self.assertEqual(self.visitors.get_count(), 5)
+        self.assertEqual(self._persisted(), 0)
+        self.base.update_state.assert_not_called()
+
+        # the whole burst is written and broadcast at once
+        self._poll(lambda: self.base.update_state.called)
+        self.assertEqual(self._persisted(), 5)
+        self.base.update_state.assert_called_once_with()
+
+        # the next visit starts a new batch
+        self.visitors.increment()
+        self._poll(lambda: self.base.update_state.call_count == 2)
+        self.assertEqual(self._persisted(), 6)
+        self.assertEqual(self.visitors.get_count(), 6)
+
+    def test_loaded(self):
+        Counter.objects.create(id=1, value=10)
+        # the counter continues from the persisted value
+        self.visitors.increment()
+        self.assertEqual(self.visitors.get_count(), 11)
+        self.visitors.flush()
+        self.assertEqual(self._persisted(), 11)
+
+        # flushing without pending visits does nothing
+        self.visitors.flush()
+        self.assertEqual(self._persisted(), 11)
+        self.base.update_state.assert_called_once_with()
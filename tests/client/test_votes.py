@@ -0,0 +1,85 @@
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from core.models import QueuedSong
+from core.musiq.votes import Votes
+
+
+class VotesTests(TransactionTestCase):
+    def setUp(self):
+        self.queue = QueuedSong.objects
+        self.queue.load()
+        songs = self.queue.enqueue_many(
+            [
+                {
+                    "internal_url": f"local:track:{i}.mp3",
+                    "external_url": f"local_library/{i}.mp3",
+                    "artist": f"Artist {i}",
+                    "title": f"Title {i}",
+                    "duration": 180,
+                }
+                for i in range(3)
+            ],
+            manually_requested=True,
+        )
+        self.keys = [song.id for song in songs]
+
+        self.musiq = SimpleNamespace(
+            base=SimpleNamespace(
+                settings=SimpleNamespace(basic=SimpleNamespace(downvotes_to_kick=2))
+            ),
+            queue=self.queue,
+            playback=mock.Mock(),
+            update_state=mock.Mock(),
+        )
+        self.votes = Votes(self.musiq)
+
+    def tearDown(self):
+        self.queue.remove_all()
+
+    def _poll(self, break_condition, timeout=1):
+        timeout *= 10
+        counter = 0
+        while counter < timeout:
+            if break_condition():
+                break
+            time.sleep(0.1)
+            counter += 1
+        else:
+            self.fail("poll timeout")
+
+    def test_buffered_votes(self):
+        for _ in range(3):
+            self.votes.vote(self.keys[1], 1)
+        self.votes.vote(self.keys[2], -1)
+        # votes are collected and applied together after a short delay
+        self.assertEqual(self.queue.votes(self.keys[1]), 0)
+        self.musiq.update_state.assert_not_called()
+
+        self._poll(lambda: self.queue.votes(self.keys[1]) == 3)
+        self.assertEqual(self.queue.votes(self.keys[2]), -1)
+        self.assertEqual(self.musiq.update_state.call_count, 1)
+        self.assertEqual(
+            [song.id for song in self.queue.ranked_songs()],
+            [self.keys[1], self.keys[0], self.keys[2]],
+        )
+
+    def test_kick(self):
+        self.votes.vote(self.keys[1], -1)
+        self.assertTrue(self.queue.contains(self.keys[1]))
+
+        # the vote that reaches the threshold is applied right away and kicks the song
+        self.votes.vote(self.keys[1], -1)
+        self.assertFalse(self.queue.contains(self.keys[1]))
+        self.assertEqual(
+            [song.id for song in self.queue.all_songs()], [self.keys[0], self.keys[2]]
+        )
+        self.musiq.playback.handle_autoplay.assert_called_once_with()
+        self.musiq.update_state.assert_called_once_with()
+
+        # the delayed flush has nothing left to apply
+        time.sleep(Votes.FLUSH_INTERVAL * 2)
+        self.musiq.update_state.assert_called_once_with()